@@ -0,0 +1,36 @@
+"""
+FastAPI dependencies providing request-scoped services
+
+Each factory builds its service once per request on the shared session;
+FastAPI caches the result, so endpoints and other dependencies that ask for
+the same service get the same instance.
+"""
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.base import get_db
+from app.services.auth_service import AuthService
+from app.services.book_service import BookService
+from app.services.recommendation_service import RecommendationService
+from app.services.review_service import ReviewService
+from app.services.user_service import UserService
+
+
+def get_book_service(db: AsyncSession = Depends(get_db)) -> BookService:
+    return BookService(db)
+
+
+def get_review_service(db: AsyncSession = Depends(get_db)) -> ReviewService:
+    return ReviewService(db)
+
+
+def get_user_service(db: AsyncSession = Depends(get_db)) -> UserService:
+    return UserService(db)
+
+
+def get_auth_service(db: AsyncSession = Depends(get_db)) -> AuthService:
+    return AuthService(db)
+
+
+def get_recommendation_service(db: AsyncSession = Depends(get_db)) -> RecommendationService:
+    return RecommendationService(db)
@@ -0,0 +1,19 @@
+"""
+Cache-Control helpers for HTTP caches (browsers, CDNs, reverse proxies)
+"""
+from fastapi import Response
+
+# How long a cache may keep serving a stale copy while it revalidates
+STALE_WHILE_REVALIDATE_SECONDS = 60
+
+
+def cacheable(response: Response, seconds: int):
+    """Allow any shared cache to serve the response for the given time"""
+    response.headers["Cache-Control"] = (
+        f"public, max-age={seconds}, stale-while-revalidate={STALE_WHILE_REVALIDATE_SECONDS}"
+    )
+
+
+def private_cacheable(response: Response, seconds: int = 60):
+    """Allow only the requesting client to cache a per-user response"""
+    response.headers["Cache-Control"] = f"private, max-age={seconds}"
@@ -0,0 +1,42 @@
+"""
+HTTP middleware for the API
+"""
+import hashlib
+
+from fastapi import Request
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import Response
+
+
+class ETagMiddleware(BaseHTTPMiddleware):
+    """
+    Add a strong ETag to successful GET responses and answer matching
+    If-None-Match requests with 304 Not Modified (no body).
+    Streaming responses (no Content-Length) are passed through untouched.
+    """
+
+    async def dispatch(self, request: Request, call_next) -> Response:
+        response = await call_next(request)
+
+        if (
+            request.method != "GET"
+            or response.status_code != 200
+            or "content-length" not in response.headers
+        ):
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and (
+            if_none_match.strip() == "*"
+            or etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+        ):
+            headers = {"etag": etag}
+            if "cache-control" in response.headers:
+                headers["cache-control"] = response.headers["cache-control"]
+            return Response(status_code=304, headers=headers)
+
+        response.headers["etag"] = etag
+        return Response(content=body, status_code=response.status_code, headers=response.headers)
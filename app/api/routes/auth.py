@@ -2,15 +2,15 @@
 Authentication-related API endpoints
 """
 from datetime import timedelta
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPAuthorizationCredentials, OAuth2PasswordRequestForm
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.base import get_db
 from app.api.schemas import Token, UserResponse, UserCreate
-from app.services.auth_service import AuthService, security
+from app.api.dependencies import get_auth_service, get_user_service
+from app.services.auth_service import AuthService, security, optional_security, invalidate_cached_token
 from app.services.user_service import UserService
-from app.config.settings import settings
+from app.config.settings import Settings, get_settings
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
@@ -18,21 +18,18 @@ router = APIRouter(prefix="/auth", tags=["authentication"])
 @router.post("/register", response_model=UserResponse)
 async def register(
     user_data: UserCreate,
-    db: AsyncSession = Depends(get_db)
+    user_service: UserService = Depends(get_user_service)
 ):
     """Register a new user"""
-    user_service = UserService(db)
-    
-    # Check if user already exists
-    existing_user = await user_service.get_user_by_email(user_data.email)
-    if existing_user:
+    # Check if user already exists (email and username in one query)
+    existing_users = await user_service.get_users_by_email_or_username(user_data.email, user_data.username)
+    if any(u.email == user_data.email for u in existing_users):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    existing_username = await user_service.get_user_by_username(user_data.username)
-    if existing_username:
+    if existing_users:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already taken"
@@ -46,10 +43,10 @@ async def register(
 @router.post("/login", response_model=Token)
 async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: AsyncSession = Depends(get_db)
+    auth_service: AuthService = Depends(get_auth_service),
+    settings: Settings = Depends(get_settings)
 ):
     """Login and get access token"""
-    auth_service = AuthService(db)
     user = await auth_service.authenticate_user(form_data.username, form_data.password)
     
     if not user:
@@ -76,14 +73,15 @@ async def login(
 @router.get("/me", response_model=UserResponse)
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncSession = Depends(get_db)
+    auth_service: AuthService = Depends(get_auth_service)
 ):
     """Get current user profile"""
-    auth_service = AuthService(db)
     return await auth_service.get_current_active_user(credentials)
 
 
 @router.post("/logout")
-async def logout():
+async def logout(credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)):
     """Logout (client-side token removal)"""
+    if credentials:
+        invalidate_cached_token(credentials.credentials)
     return {"message": "Successfully logged out"}
@@ -1,66 +1,120 @@
 """
 Book-related API endpoints
 """
-from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
+import asyncio
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models.base import get_db
-from app.api.schemas import BookCreate, BookUpdate, BookResponse, ReviewResponse
+from app.api.schemas import (
+    BookCreate, BookUpdate, BookResponse, BookWithReviewsResponse, ReviewCreateForBook, ReviewResponse,
+    BulkSummaryRequest, BulkSummaryResponse, BookSummary
+)
+from app.api.dependencies import get_book_service, get_review_service
+from app.api.http_cache import cacheable
+from app.services.cache_service import cache_service
+from app.api.streaming import stream_json_array
 from app.services.book_service import BookService
 from app.services.review_service import ReviewService
 
 router = APIRouter(prefix="/books", tags=["books"])
 
+# Book details change rarely; let HTTP caches serve them for a while
+BOOK_MAX_AGE_SECONDS = 300
+
 
 @router.post("/", response_model=BookResponse)
 async def create_book(
     book: BookCreate,
-    db: AsyncSession = Depends(get_db)
+    book_service: BookService = Depends(get_book_service)
 ):
     """Create a new book"""
-    book_service = BookService(db)
     return await book_service.create_book(book)
 
 
-@router.get("/", response_model=List[BookResponse])
+@router.get("/", response_model=List[Union[BookWithReviewsResponse, BookResponse]])
 async def get_books(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
+    after_id: Optional[int] = Query(
+        None, ge=0, description="Return books after this ID (keyset pagination; overrides skip)"
+    ),
     genre: Optional[str] = Query(None),
     author: Optional[str] = Query(None),
     search: Optional[str] = Query(None),
-    db: AsyncSession = Depends(get_db)
+    include: Optional[str] = Query(None, description="Set to 'reviews' to embed each book's reviews"),
+    book_service: BookService = Depends(get_book_service)
 ):
     """Get books with optional filtering"""
-    book_service = BookService(db)
-    return await book_service.get_books(
+    if include != "reviews":
+        # Serve the serialized page from Redis when possible (the ETag middleware
+        # then handles If-None-Match); otherwise stream it and cache the body
+        on_complete = None
+        if cache_service.is_connected:
+            cache_key = cache_service._generate_key(
+                cache_service.PREFIX_BOOK_LIST,
+                "|".join(str(arg) for arg in (skip, limit, after_id, genre, author, search))
+            )
+            cached_body = await cache_service.get_raw(cache_key)
+            if cached_body is not None:
+                return Response(content=cached_body, media_type="application/json")
+            
+            async def on_complete(body: bytes):
+                await cache_service.set_raw(cache_key, body, cache_service.TTL_BOOK_LIST)
+        
+        return stream_json_array(
+            book_service.stream_books(
+                skip=skip, 
+                limit=limit, 
+                genre=genre, 
+                author=author, 
+                search=search,
+                after_id=after_id
+            ),
+            BookResponse,
+            on_complete=on_complete
+        )
+    
+    # Embedded reviews are eager-loaded in one batch, so this path stays buffered
+    books = await book_service.get_books(
         skip=skip, 
         limit=limit, 
         genre=genre, 
         author=author, 
-        search=search
+        search=search,
+        include_reviews=True,
+        after_id=after_id
     )
+    return [BookWithReviewsResponse.model_validate(book) for book in books]
 
 
-@router.get("/{book_id}", response_model=BookResponse)
-async def get_book(book_id: int, db: AsyncSession = Depends(get_db)):
+@router.get("/{book_id}", response_model=Union[BookWithReviewsResponse, BookResponse])
+async def get_book(
+    book_id: int,
+    response: Response,
+    include: Optional[str] = Query(None, description="Set to 'reviews' to embed the book's reviews"),
+    book_service: BookService = Depends(get_book_service)
+):
     """Get a specific book by ID"""
-    book_service = BookService(db)
-    book = await book_service.get_book_by_id(book_id)
+    include_reviews = include == "reviews"
+    book = await book_service.get_book_by_id(book_id, include_reviews=include_reviews)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
-    return book
+    cacheable(response, BOOK_MAX_AGE_SECONDS)
+    
+    # Reviews are only loaded when requested, so pick the schema explicitly
+    response_schema = BookWithReviewsResponse if include_reviews else BookResponse
+    return response_schema.model_validate(book)
 
 
 @router.put("/{book_id}", response_model=BookResponse)
 async def update_book(
     book_id: int,
     book_update: BookUpdate,
-    db: AsyncSession = Depends(get_db)
+    book_service: BookService = Depends(get_book_service)
 ):
     """Update a specific book"""
-    book_service = BookService(db)
     book = await book_service.update_book(book_id, book_update)
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
@@ -68,9 +122,8 @@ async def update_book(
 
 
 @router.delete("/{book_id}")
-async def delete_book(book_id: int, db: AsyncSession = Depends(get_db)):
+async def delete_book(book_id: int, book_service: BookService = Depends(get_book_service)):
     """Delete a specific book"""
-    book_service = BookService(db)
     success = await book_service.delete_book(book_id)
     if not success:
         raise HTTPException(status_code=404, detail="Book not found")
@@ -80,26 +133,41 @@ async def delete_book(book_id: int, db: AsyncSession = Depends(get_db)):
 @router.post("/{book_id}/generate-summary")
 async def generate_book_summary(
     book_id: int,
-    db: AsyncSession = Depends(get_db)
+    book_service: BookService = Depends(get_book_service)
 ):
     """Generate AI summary for a book"""
-    book_service = BookService(db)
     summary = await book_service.generate_summary(book_id)
     if not summary:
         raise HTTPException(status_code=404, detail="Book not found")
     return {"book_id": book_id, "summary": summary}
 
 
+@router.post("/generate-summaries", response_model=BulkSummaryResponse)
+async def generate_book_summaries(
+    request: BulkSummaryRequest,
+    book_service: BookService = Depends(get_book_service)
+):
+    """Generate AI summaries for several books at once"""
+    book_ids = list(dict.fromkeys(request.book_ids))
+    summaries = await book_service.generate_summaries(book_ids)
+    return BulkSummaryResponse(
+        summaries=[
+            BookSummary(book_id=book_id, summary=summary)
+            for book_id, summary in summaries.items()
+        ],
+        missing_book_ids=[book_id for book_id in book_ids if book_id not in summaries]
+    )
+
+
 # Book review endpoints
 @router.post("/{book_id}/reviews", response_model=ReviewResponse)
 async def add_review_to_book(
     book_id: int,
-    review_data: dict,
-    db: AsyncSession = Depends(get_db)
+    review_data: ReviewCreateForBook,
+    review_service: ReviewService = Depends(get_review_service)
 ):
     """Add a review for a book"""
     # Note: This would normally require authentication to get user_id
-    review_service = ReviewService(db)
     # For now, using user_id from request body, but should come from JWT token
     review = await review_service.create_review_for_book(book_id, review_data)
     if not review:
@@ -112,10 +180,9 @@ async def get_book_reviews(
     book_id: int,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: AsyncSession = Depends(get_db)
+    review_service: ReviewService = Depends(get_review_service)
 ):
     """Retrieve all reviews for a book"""
-    review_service = ReviewService(db)
     return await review_service.get_reviews_for_book(
         book_id=book_id,
         skip=skip,
@@ -126,22 +193,29 @@ async def get_book_reviews(
 @router.get("/{book_id}/summary")
 async def get_book_summary(
     book_id: int,
-    db: AsyncSession = Depends(get_db)
+    db: AsyncSession = Depends(get_db),
+    review_db: AsyncSession = Depends(get_db, use_cache=False)
 ):
     """Get a summary and aggregated rating for a book"""
+    # A session can't run queries concurrently, so each service gets its own
     book_service = BookService(db)
-    review_service = ReviewService(db)
+    review_service = ReviewService(review_db)
     
-    book = await book_service.get_book_by_id(book_id)
+    book, review_summary = await asyncio.gather(
+        book_service.get_book_by_id(book_id),
+        review_service.get_review_summary_for_book(book_id)
+    )
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
     
-    review_summary = await review_service.get_review_summary_for_book(book_id)
+    average_rating = book.average_rating
     
     return {
         "book_id": book_id,
         "title": book.title,
         "author": book.author,
         "summary": book.summary,
+        "average_rating": round(average_rating, 2) if average_rating is not None else None,
+        "total_reviews": book.total_reviews,
         "review_summary": review_summary
     }
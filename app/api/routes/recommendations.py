@@ -2,16 +2,17 @@
 Book recommendation API endpoints with ML-powered recommendations
 """
 from typing import List, Optional
-from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Query
+from datetime import datetime, timezone
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from fastapi.security import HTTPAuthorizationCredentials
-from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 
-from app.models.base import get_db
 from app.api.schemas import BookResponse, RecommendationRequest, RecommendationResponse
+from app.api.dependencies import get_auth_service, get_recommendation_service
+from app.api.http_cache import cacheable, private_cacheable
 from app.services.auth_service import AuthService, security
-from app.services.recommendation_service import RecommendationService
+from app.services.cache_service import CacheService
+from app.services.recommendation_service import RecommendationService, summary_batcher
 
 router = APIRouter(prefix="/recommendations", tags=["recommendations"])
 
@@ -28,10 +29,12 @@ class SummaryResponse(BaseModel):
 
 @router.get("/", response_model=RecommendationResponse)
 async def get_recommendations(
+    response: Response,
     genre: Optional[str] = Query(None, description="Filter by genre"),
     count: int = Query(5, ge=1, le=20, description="Number of recommendations"),
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncSession = Depends(get_db)
+    auth_service: AuthService = Depends(get_auth_service),
+    recommendation_service: RecommendationService = Depends(get_recommendation_service)
 ):
     """
     Get personalized book recommendations based on user preferences.
@@ -39,10 +42,9 @@ async def get_recommendations(
     Uses ML-based content filtering and collaborative filtering to find
     books that match user interests.
     """
-    auth_service = AuthService(db)
     current_user = await auth_service.get_current_active_user(credentials)
+    private_cacheable(response, CacheService.TTL_RECOMMENDATIONS)
     
-    recommendation_service = RecommendationService(db)
     return await recommendation_service.get_recommendations_for_user(
         user=current_user,
         genre=genre,
@@ -52,16 +54,17 @@ async def get_recommendations(
 
 @router.get("/popular", response_model=List[BookResponse])
 async def get_popular_books(
+    response: Response,
     limit: int = Query(10, ge=1, le=50),
     genre: Optional[str] = Query(None),
-    db: AsyncSession = Depends(get_db)
+    recommendation_service: RecommendationService = Depends(get_recommendation_service)
 ):
     """
     Get popular books based on average ratings from reviews.
     
     No authentication required - public endpoint.
     """
-    recommendation_service = RecommendationService(db)
+    cacheable(response, CacheService.TTL_POPULAR_BOOKS)
     return await recommendation_service.get_popular_books(
         limit=limit,
         genre=genre
@@ -72,7 +75,7 @@ async def get_popular_books(
 async def get_similar_books(
     book_id: int,
     limit: int = Query(5, ge=1, le=20),
-    db: AsyncSession = Depends(get_db)
+    recommendation_service: RecommendationService = Depends(get_recommendation_service)
 ):
     """
     Get books similar to the specified book using ML content-based filtering.
@@ -80,7 +83,6 @@ async def get_similar_books(
     Uses TF-IDF vectorization on genre, author, and summary to find
     similar books based on content similarity.
     """
-    recommendation_service = RecommendationService(db)
     similar_books = await recommendation_service.get_similar_books(
         book_id=book_id,
         limit=limit
@@ -98,9 +100,11 @@ async def get_similar_books(
 @router.get("/for-user/{user_id}", response_model=List[BookResponse])
 async def get_recommendations_by_history(
     user_id: int,
+    response: Response,
     limit: int = Query(5, ge=1, le=20),
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncSession = Depends(get_db)
+    auth_service: AuthService = Depends(get_auth_service),
+    recommendation_service: RecommendationService = Depends(get_recommendation_service)
 ):
     """
     Get book recommendations based on user's review history.
@@ -108,10 +112,9 @@ async def get_recommendations_by_history(
     Uses collaborative filtering to find books in genres the user
     has rated highly.
     """
-    auth_service = AuthService(db)
     await auth_service.get_current_active_user(credentials)
+    private_cacheable(response, CacheService.TTL_RECOMMENDATIONS)
     
-    recommendation_service = RecommendationService(db)
     return await recommendation_service.get_books_by_user_history(
         user_id=user_id,
         limit=limit
@@ -122,7 +125,7 @@ async def get_recommendations_by_history(
 async def generate_content_summary(
     request: SummaryRequest,
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: AsyncSession = Depends(get_db)
+    auth_service: AuthService = Depends(get_auth_service)
 ):
     """
     Generate a summary for given book content using Llama3/OpenRouter AI.
@@ -130,14 +133,13 @@ async def generate_content_summary(
     This endpoint uses the configured AI model (OpenRouter Llama3 or local)
     to generate a concise summary of the provided content.
     """
-    auth_service = AuthService(db)
     await auth_service.get_current_active_user(credentials)
     
-    recommendation_service = RecommendationService(db)
-    summary = await recommendation_service.generate_content_summary(request.content)
+    # Concurrent requests are coalesced into a single AI model call
+    summary = await summary_batcher.submit(request.content)
     
     return SummaryResponse(
         summary=summary,
         content_length=len(request.content),
-        generated_at=datetime.utcnow()
+        generated_at=datetime.now(timezone.utc)
     )
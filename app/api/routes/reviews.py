@@ -2,11 +2,11 @@
 Review-related API endpoints
 """
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import APIRouter, Body, Depends, HTTPException, Query
 
-from app.models.base import get_db
 from app.api.schemas import ReviewCreate, ReviewUpdate, ReviewResponse
+from app.api.dependencies import get_review_service
+from app.api.streaming import stream_json_array
 from app.services.review_service import ReviewService
 
 router = APIRouter(prefix="/reviews", tags=["reviews"])
@@ -15,35 +15,44 @@ router = APIRouter(prefix="/reviews", tags=["reviews"])
 @router.post("/", response_model=ReviewResponse)
 async def create_review(
     review: ReviewCreate,
-    db: AsyncSession = Depends(get_db)
+    review_service: ReviewService = Depends(get_review_service)
 ):
     """Create a new review"""
-    review_service = ReviewService(db)
     return await review_service.create_review(review)
 
 
+@router.post("/bulk", response_model=List[ReviewResponse])
+async def bulk_create_reviews(
+    reviews: List[ReviewCreate] = Body(..., min_length=1, max_length=1000),
+    review_service: ReviewService = Depends(get_review_service)
+):
+    """Create many reviews in one request (e.g. for imports)"""
+    return await review_service.bulk_create_reviews(reviews)
+
+
 @router.get("/", response_model=List[ReviewResponse])
 async def get_reviews(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
     book_id: Optional[int] = Query(None),
     user_id: Optional[int] = Query(None),
-    db: AsyncSession = Depends(get_db)
+    review_service: ReviewService = Depends(get_review_service)
 ):
     """Get reviews with optional filtering"""
-    review_service = ReviewService(db)
-    return await review_service.get_reviews(
-        skip=skip, 
-        limit=limit, 
-        book_id=book_id, 
-        user_id=user_id
+    return stream_json_array(
+        review_service.stream_reviews(
+            skip=skip, 
+            limit=limit, 
+            book_id=book_id, 
+            user_id=user_id
+        ),
+        ReviewResponse
     )
 
 
 @router.get("/{review_id}", response_model=ReviewResponse)
-async def get_review(review_id: int, db: AsyncSession = Depends(get_db)):
+async def get_review(review_id: int, review_service: ReviewService = Depends(get_review_service)):
     """Get a specific review by ID"""
-    review_service = ReviewService(db)
     review = await review_service.get_review_by_id(review_id)
     if not review:
         raise HTTPException(status_code=404, detail="Review not found")
@@ -54,10 +63,9 @@ async def get_review(review_id: int, db: AsyncSession = Depends(get_db)):
 async def update_review(
     review_id: int,
     review_update: ReviewUpdate,
-    db: AsyncSession = Depends(get_db)
+    review_service: ReviewService = Depends(get_review_service)
 ):
     """Update a specific review"""
-    review_service = ReviewService(db)
     review = await review_service.update_review(review_id, review_update)
     if not review:
         raise HTTPException(status_code=404, detail="Review not found")
@@ -65,9 +73,8 @@ async def update_review(
 
 
 @router.delete("/{review_id}")
-async def delete_review(review_id: int, db: AsyncSession = Depends(get_db)):
+async def delete_review(review_id: int, review_service: ReviewService = Depends(get_review_service)):
     """Delete a specific review"""
-    review_service = ReviewService(db)
     success = await review_service.delete_review(review_id)
     if not success:
         raise HTTPException(status_code=404, detail="Review not found")
@@ -77,9 +84,8 @@ async def delete_review(review_id: int, db: AsyncSession = Depends(get_db)):
 @router.get("/book/{book_id}/summary")
 async def get_book_review_summary(
     book_id: int,
-    db: AsyncSession = Depends(get_db)
+    review_service: ReviewService = Depends(get_review_service)
 ):
     """Get AI-generated summary of reviews for a book"""
-    review_service = ReviewService(db)
     summary = await review_service.generate_review_summary(book_id)
     return {"book_id": book_id, "summary": summary}
@@ -3,11 +3,12 @@ User-related API endpoints
 """
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.models.base import get_db
 from app.api.schemas import UserCreate, UserUpdate, UserResponse
+from app.api.dependencies import get_user_service
+from app.api.streaming import stream_json_array
 from app.services.user_service import UserService
+from app.services.auth_service import invalidate_cached_user
 
 router = APIRouter(prefix="/users", tags=["users"])
 
@@ -15,16 +16,14 @@ router = APIRouter(prefix="/users", tags=["users"])
 @router.post("/", response_model=UserResponse)
 async def create_user(
     user: UserCreate,
-    db: AsyncSession = Depends(get_db)
+    user_service: UserService = Depends(get_user_service)
 ):
     """Create a new user"""
-    user_service = UserService(db)
-    existing_user = await user_service.get_user_by_email(user.email)
-    if existing_user:
+    existing_users = await user_service.get_users_by_email_or_username(user.email, user.username)
+    if any(u.email == user.email for u in existing_users):
         raise HTTPException(status_code=400, detail="Email already registered")
     
-    existing_username = await user_service.get_user_by_username(user.username)
-    if existing_username:
+    if existing_users:
         raise HTTPException(status_code=400, detail="Username already taken")
     
     return await user_service.create_user(user)
@@ -34,17 +33,15 @@ async def create_user(
 async def get_users(
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=1000),
-    db: AsyncSession = Depends(get_db)
+    user_service: UserService = Depends(get_user_service)
 ):
     """Get users with pagination"""
-    user_service = UserService(db)
-    return await user_service.get_users(skip=skip, limit=limit)
+    return stream_json_array(user_service.stream_users(skip=skip, limit=limit), UserResponse)
 
 
 @router.get("/{user_id}", response_model=UserResponse)
-async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
+async def get_user(user_id: int, user_service: UserService = Depends(get_user_service)):
     """Get a specific user by ID"""
-    user_service = UserService(db)
     user = await user_service.get_user_by_id(user_id)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -55,21 +52,21 @@ async def get_user(user_id: int, db: AsyncSession = Depends(get_db)):
 async def update_user(
     user_id: int,
     user_update: UserUpdate,
-    db: AsyncSession = Depends(get_db)
+    user_service: UserService = Depends(get_user_service)
 ):
     """Update a specific user"""
-    user_service = UserService(db)
     user = await user_service.update_user(user_id, user_update)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    invalidate_cached_user(user_id)
     return user
 
 
 @router.delete("/{user_id}")
-async def delete_user(user_id: int, db: AsyncSession = Depends(get_db)):
+async def delete_user(user_id: int, user_service: UserService = Depends(get_user_service)):
     """Delete a specific user"""
-    user_service = UserService(db)
     success = await user_service.delete_user(user_id)
     if not success:
         raise HTTPException(status_code=404, detail="User not found")
+    invalidate_cached_user(user_id)
     return {"message": "User deleted successfully"}
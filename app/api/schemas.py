@@ -3,7 +3,7 @@ Pydantic schemas for API request/response models
 """
 from typing import Optional, List
 from datetime import datetime
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 
 
 # User schemas
@@ -31,8 +31,7 @@ class UserResponse(UserBase):
     is_admin: bool
     created_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # Book schemas
@@ -61,8 +60,7 @@ class BookResponse(BookBase):
     created_at: datetime
     updated_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 # Review schemas
@@ -76,6 +74,11 @@ class ReviewCreate(ReviewBase):
     user_id: int = Field(default=1, description="User ID (defaults to 1 for demo purposes)")
 
 
+class ReviewCreateForBook(ReviewBase):
+    """Review body for POST /books/{book_id}/reviews (book_id comes from the path)"""
+    user_id: int = Field(default=1, description="User ID (defaults to 1 for demo purposes)")
+
+
 class ReviewUpdate(BaseModel):
     rating: Optional[float] = Field(None, ge=1.0, le=5.0)
     review_text: Optional[str] = None
@@ -88,8 +91,11 @@ class ReviewResponse(ReviewBase):
     created_at: datetime
     updated_at: datetime
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class BookWithReviewsResponse(BookResponse):
+    reviews: List[ReviewResponse]
 
 
 # AI-related schemas
@@ -103,6 +109,20 @@ class SummaryResponse(BaseModel):
     generated_at: datetime
 
 
+class BulkSummaryRequest(BaseModel):
+    book_ids: List[int] = Field(..., min_length=1, max_length=100)
+
+
+class BookSummary(BaseModel):
+    book_id: int
+    summary: str
+
+
+class BulkSummaryResponse(BaseModel):
+    summaries: List[BookSummary]
+    missing_book_ids: List[int]
+
+
 class RecommendationRequest(BaseModel):
     user_id: Optional[int] = None
     genre: Optional[str] = None
@@ -122,3 +142,13 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     username: Optional[str] = None
+
+
+# Build the validators/serializers of the hot response models at import time
+# so the first request to each endpoint doesn't pay for it
+for _schema in (
+    UserResponse, BookResponse, ReviewResponse, BookWithReviewsResponse,
+    RecommendationResponse, Token,
+):
+    _schema.model_rebuild(force=True)
+del _schema
@@ -0,0 +1,54 @@
+"""
+Helpers for streaming large list responses
+"""
+from typing import AsyncIterator, Awaitable, Callable, Optional, Type
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+# Rows serialized per chunk written to the socket
+STREAM_CHUNK_SIZE = 100
+
+
+async def _json_array_chunks(rows: AsyncIterator, schema: Type[BaseModel]) -> AsyncIterator[bytes]:
+    """Serialize rows one by one into the pieces of a JSON array"""
+    yield b"["
+    chunk = []
+    first = True
+    async for row in rows:
+        chunk.append(schema.model_validate(row).model_dump_json().encode())
+        if len(chunk) >= STREAM_CHUNK_SIZE:
+            yield (b"" if first else b",") + b",".join(chunk)
+            chunk = []
+            first = False
+    if chunk:
+        yield (b"" if first else b",") + b",".join(chunk)
+    yield b"]"
+
+
+async def _tee_chunks(
+    chunks: AsyncIterator[bytes], on_complete: Callable[[bytes], Awaitable]
+) -> AsyncIterator[bytes]:
+    """Pass chunks through and hand the full body to on_complete at the end"""
+    body = []
+    async for chunk in chunks:
+        body.append(chunk)
+        yield chunk
+    await on_complete(b"".join(body))
+
+
+def stream_json_array(
+    rows: AsyncIterator,
+    schema: Type[BaseModel],
+    on_complete: Optional[Callable[[bytes], Awaitable]] = None
+) -> StreamingResponse:
+    """
+    Stream rows from an async DB cursor as a JSON array.
+    Only one chunk of rows is serialized at a time, and the first bytes
+    are sent as soon as the first rows arrive. If on_complete is given it
+    receives the whole body once streaming finishes (e.g. to cache it).
+    """
+    chunks = _json_array_chunks(rows, schema)
+    if on_complete:
+        chunks = _tee_chunks(chunks, on_complete)
+    return StreamingResponse(chunks, media_type="application/json")
@@ -1,19 +1,25 @@
 """
 Main FastAPI application
 """
-from datetime import datetime
-from fastapi import FastAPI, Depends, HTTPException
+import asyncio
+from datetime import datetime, timezone
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from contextlib import asynccontextmanager
 from loguru import logger
 from pydantic import BaseModel
-from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.config.settings import settings
 from app.api.routes import books, users, reviews, auth, recommendations
-from app.models.base import engine, Base, get_db
+from app.api.middleware import ETagMiddleware
+from app.models.base import engine, Base, AsyncSessionLocal, warm_up_pool
 from app.services.llama_service import llama_service
-from app.services.recommendation_service import RecommendationService
+from app.services.recommendation_service import (
+    RecommendationService,
+    refresh_tfidf_index_periodically,
+    summary_batcher,
+)
 from app.services.cache_service import cache_service
 
 
@@ -39,6 +45,19 @@ async def lifespan(app: FastAPI):
         await conn.run_sync(Base.metadata.create_all)
     logger.info("Database tables created")
     
+    # Pre-open pooled connections (SQLite uses a single static connection)
+    if engine.dialect.name == "postgresql":
+        opened = await warm_up_pool(settings.DB_POOL_SIZE)
+        logger.info(f"Database connection pool warmed ({opened} connections)")
+    
+    # Build the TF-IDF similarity index and keep it fresh in the background
+    async with AsyncSessionLocal() as session:
+        await RecommendationService(session).warm_tfidf_index()
+    tfidf_refresh_task = asyncio.create_task(
+        refresh_tfidf_index_periodically(settings.TFIDF_REFRESH_INTERVAL_SECONDS)
+    )
+    logger.info("TF-IDF index built")
+    
     # Initialize AI model
     await llama_service.initialize()
     logger.info("AI service initialized")
@@ -51,11 +70,19 @@ async def lifespan(app: FastAPI):
         else:
             logger.warning("Redis cache not available - running without cache")
     
+    # Start summary request batcher
+    summary_batcher.start()
+    
     yield
     
     # Shutdown
     logger.info("Shutting down the application...")
     
+    await summary_batcher.stop()
+    tfidf_refresh_task.cancel()
+    
+    await llama_service.close()
+    
     # Disconnect cache
     if cache_service.is_connected:
         await cache_service.disconnect()
@@ -68,7 +95,8 @@ app = FastAPI(
     title=settings.PROJECT_NAME,
     description=settings.DESCRIPTION,
     version=settings.VERSION,
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -80,6 +108,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Add ETag / If-None-Match support for GET responses
+app.add_middleware(ETagMiddleware)
+
 # Include API routes
 app.include_router(auth.router, prefix=settings.API_V1_STR)
 app.include_router(books.router, prefix=settings.API_V1_STR)
@@ -129,21 +160,23 @@ async def clear_cache():
     if not cache_service.is_connected:
         return {"status": "cache not connected", "cleared": 0}
     
-    # Clear all cache patterns
-    total = 0
-    total += await cache_service.clear_pattern("rec:*")
-    total += await cache_service.clear_pattern("popular:*")
-    total += await cache_service.clear_pattern("summary:*")
-    total += await cache_service.clear_pattern("similar:*")
+    # Clear all cache patterns in shared pipelined round trips
+    removed = await cache_service.clear_patterns(*(
+        f"{prefix}*"
+        for prefix in (
+            cache_service.PREFIX_RECOMMENDATIONS,
+            cache_service.PREFIX_POPULAR,
+            cache_service.PREFIX_SUMMARY,
+            cache_service.PREFIX_SIMILAR,
+            cache_service.PREFIX_BOOK_LIST,
+        )
+    ))
     
-    return {"status": "cleared", "keys_removed": total}
+    return {"status": "cleared", "keys_removed": removed}
 
 
 @app.post(f"{settings.API_V1_STR}/generate-summary", response_model=GenerateSummaryResponse)
-async def generate_summary(
-    request: GenerateSummaryRequest,
-    db: AsyncSession = Depends(get_db)
-):
+async def generate_summary(request: GenerateSummaryRequest):
     """
     Generate a summary for given book content using Llama3/OpenRouter AI.
     
@@ -155,16 +188,30 @@ async def generate_summary(
     if not request.content or len(request.content.strip()) == 0:
         raise HTTPException(status_code=400, detail="Content cannot be empty")
     
-    recommendation_service = RecommendationService(db)
-    summary = await recommendation_service.generate_content_summary(request.content)
+    # Concurrent requests are coalesced into a single AI model call
+    summary = await summary_batcher.submit(request.content)
     
     return GenerateSummaryResponse(
         summary=summary,
         content_length=len(request.content),
-        generated_at=datetime.utcnow()
+        generated_at=datetime.now(timezone.utc)
     )
 
 
 if __name__ == "__main__":
+    import os
+    import sys
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    
+    # uvloop is POSIX-only; httptools works everywhere.
+    # Each worker has its own DB pool: keep workers x (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+    # below the database's max_connections (WEB_CONCURRENCY overrides the count)
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        workers=int(os.environ.get("WEB_CONCURRENCY", os.cpu_count())),
+        log_level=settings.LOG_LEVEL.lower()
+    )
@@ -1,12 +1,15 @@
 """
 Base database model and configuration
 """
+import asyncio
 import re
 import ssl
-from datetime import datetime
 from typing import AsyncGenerator
-from sqlalchemy import Column, Integer, DateTime
+from loguru import logger
+from sqlalchemy import Column, Integer, DateTime, event
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.sql.expression import FunctionElement
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 
@@ -14,22 +17,27 @@ from app.config.settings import settings
 
 Base = declarative_base()
 
-# Convert DATABASE_URL to async format
-database_url = settings.DATABASE_URL
+# URL parameters asyncpg doesn't accept, and leftover separators
+CHANNEL_BINDING_PARAM = re.compile(r'[&?]channel_binding=[^&]*')
+SSLMODE_PARAM = re.compile(r'[&?]sslmode=[^&]*')
+TRAILING_SEPARATOR = re.compile(r'[?&]$')
+
+# Convert DATABASE_URL to async format (prefer PgBouncer when configured)
+database_url = settings.PGBOUNCER_URL or settings.DATABASE_URL
 
 # Remove parameters not supported by asyncpg
 if "channel_binding" in database_url:
-    database_url = re.sub(r'[&?]channel_binding=[^&]*', '', database_url)
+    database_url = CHANNEL_BINDING_PARAM.sub('', database_url)
 
 # Check if SSL is required (for cloud databases like Neon)
 use_ssl = "sslmode=require" in database_url or "neon" in database_url
 
 # Remove sslmode parameter (asyncpg uses 'ssl' instead)
 if "sslmode" in database_url:
-    database_url = re.sub(r'[&?]sslmode=[^&]*', '', database_url)
+    database_url = SSLMODE_PARAM.sub('', database_url)
 
 # Clean up URL (remove trailing ? or &)
-database_url = re.sub(r'[?&]$', '', database_url)
+database_url = TRAILING_SEPARATOR.sub('', database_url)
 
 if database_url.startswith("postgresql://"):
     async_database_url = database_url.replace("postgresql://", "postgresql+asyncpg://")
@@ -43,31 +51,98 @@ if database_url.startswith("postgresql://"):
         ssl_context.verify_mode = ssl.CERT_NONE
         connect_args["ssl"] = ssl_context
     
-    engine = create_async_engine(async_database_url, echo=False, connect_args=connect_args)
+    if settings.PGBOUNCER_URL:
+        # PgBouncer in transaction mode cannot use server-side prepared statements
+        connect_args["statement_cache_size"] = 0
+        async_database_url += ("&" if "?" in async_database_url else "?") + "prepared_statement_cache_size=0"
+    
+    # Pooled asyncpg connections, checked before use and recycled periodically
+    engine = create_async_engine(
+        async_database_url,
+        echo=False,
+        connect_args=connect_args,
+        query_cache_size=settings.DB_QUERY_CACHE_SIZE,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_pre_ping=True,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
 elif database_url.startswith("sqlite://"):
     async_database_url = database_url.replace("sqlite://", "sqlite+aiosqlite://")
     engine = create_async_engine(
         async_database_url, 
         echo=False,
         connect_args={"check_same_thread": False},
+        query_cache_size=settings.DB_QUERY_CACHE_SIZE,
         poolclass=StaticPool,
     )
 else:
     async_database_url = database_url
-    engine = create_async_engine(async_database_url, echo=False)
+    engine = create_async_engine(
+        async_database_url, echo=False, query_cache_size=settings.DB_QUERY_CACHE_SIZE
+    )
+
+if settings.LOG_LEVEL.upper() == "DEBUG":
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _log_uncached_statement(conn, cursor, statement, parameters, context, executemany):
+        """Flag statements that bypass the compiled cache (e.g. inline literals)"""
+        compiled = getattr(context, "compiled", None)
+        if compiled is not None and compiled.cache_key is None:
+            logger.debug(f"SQL statement not cacheable: {statement}")
 
 AsyncSessionLocal = async_sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
 
 
+async def warm_up_pool(size: int) -> int:
+    """
+    Open `size` pooled connections concurrently and return them to the pool,
+    so the first requests don't pay the connect + TLS handshake.
+    Returns the number of connections opened.
+    """
+    connections = await asyncio.gather(
+        *(engine.connect() for _ in range(size)), return_exceptions=True
+    )
+    opened = [conn for conn in connections if not isinstance(conn, BaseException)]
+    for conn in opened:
+        await conn.close()
+    
+    if len(opened) < size:
+        logger.warning(f"Connection pool warm-up opened {len(opened)}/{size} connections")
+    return len(opened)
+
+
+class utcnow(FunctionElement):
+    """Current UTC time as a naive timestamp, evaluated by the database"""
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(utcnow)
+def _utcnow_default(element, compiler, **kw):
+    # SQLite's CURRENT_TIMESTAMP is already UTC
+    return "CURRENT_TIMESTAMP"
+
+
+@compiles(utcnow, "postgresql")
+def _utcnow_postgresql(element, compiler, **kw):
+    # now() follows the session TimeZone; store UTC like datetime.utcnow did
+    return "TIMEZONE('utc', CURRENT_TIMESTAMP)"
+
+
 class BaseModel(Base):
     """Base model with common fields"""
     __abstract__ = True
     
     id = Column(Integer, primary_key=True, index=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # utcnow() is rendered into the INSERT/UPDATE itself (no Python call or
+    # bound parameter) and read back via RETURNING thanks to eager_defaults
+    created_at = Column(DateTime, default=utcnow(), server_default=utcnow())
+    updated_at = Column(DateTime, default=utcnow(), server_default=utcnow(), onupdate=utcnow())
+    
+    __mapper_args__ = {"eager_defaults": True}
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
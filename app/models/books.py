@@ -1,7 +1,8 @@
 """
 Book model for the database
 """
-from sqlalchemy import Column, String, Text, Integer
+from sqlalchemy import Column, String, Text, Integer, Float, Index, DDL, event, func
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 from .base import BaseModel
 
@@ -15,9 +16,23 @@ class Book(BaseModel):
     - genre: Book genre/category
     - year_published: Year the book was published
     - summary: Brief description/summary of the book
+    - total_reviews / rating_sum: Review counters, kept up to date on every
+      review write (see app.models.reviews) so ratings are never re-aggregated
     """
     __tablename__ = "books"
     
+    # Trigram GIN indexes so the ILIKE '%term%' search and genre filters
+    # don't scan the table (PostgreSQL only; other dialects skip them)
+    __table_args__ = tuple(
+        Index(
+            f"ix_books_{column}_trgm",
+            column,
+            postgresql_using="gin",
+            postgresql_ops={column: "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql")
+        for column in ("title", "author", "summary", "genre")
+    )
+    
     # Required fields as per specification
     title = Column(String(255), nullable=False, index=True)
     author = Column(String(255), nullable=False, index=True)
@@ -25,8 +40,29 @@ class Book(BaseModel):
     year_published = Column(Integer)
     summary = Column(Text)
     
+    # Review counters
+    total_reviews = Column(Integer, nullable=False, default=0, server_default="0")
+    rating_sum = Column(Float, nullable=False, default=0.0, server_default="0")
+    
     # Relationships
     reviews = relationship("Review", back_populates="book", cascade="all, delete-orphan")
     
+    @hybrid_property
+    def average_rating(self):
+        """Mean review rating, or None without reviews"""
+        return self.rating_sum / self.total_reviews if self.total_reviews else None
+    
+    @average_rating.expression
+    def average_rating(cls):
+        return cls.rating_sum / func.nullif(cls.total_reviews, 0)
+    
     def __repr__(self):
         return f"<Book(id={self.id}, title='{self.title}', author='{self.author}')>"
+
+
+# The trigram indexes need the pg_trgm extension
+event.listen(
+    Book.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
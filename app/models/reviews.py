@@ -1,9 +1,15 @@
 """
 Review model for the database
 """
-from sqlalchemy import Column, Text, Integer, ForeignKey, Float, CheckConstraint
+from typing import Dict, List
+
+from sqlalchemy import (
+    Column, Text, Integer, ForeignKey, Float, CheckConstraint, Index,
+    bindparam, event, func, inspect, select, update
+)
 from sqlalchemy.orm import relationship
 from .base import BaseModel
+from .books import Book
 
 
 class Review(BaseModel):
@@ -18,16 +24,23 @@ class Review(BaseModel):
     __tablename__ = "reviews"
     
     # Foreign keys
-    book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), nullable=False, index=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
     
     # Review content
     review_text = Column(Text)
     rating = Column(Float, nullable=False)
     
     # Add check constraint for rating range
+    # Indexes carry rating so per-book stats and "user's highly rated" lookups
+    # are index-only (they also serve plain book_id / user_id filters).
+    # The partial index holds only positive reviews, for user-history
+    # recommendations (liked genres and the "already reviewed" check).
     __table_args__ = (
         CheckConstraint('rating >= 1 AND rating <= 5', name='valid_rating'),
+        Index('ix_reviews_book_rating', 'book_id', postgresql_include=['rating']),
+        Index('ix_reviews_user_rating', 'user_id', 'rating'),
+        Index('ix_reviews_positive_user', 'user_id', 'book_id', postgresql_where=rating >= 4),
     )
     
     # Relationships
@@ -36,3 +49,75 @@ class Review(BaseModel):
     
     def __repr__(self):
         return f"<Review(id={self.id}, book_id={self.book_id}, user_id={self.user_id}, rating={self.rating})>"
+
+
+_books = Book.__table__
+_reviews = Review.__table__
+
+# Apply a (review count, rating sum) delta to one book's counters.
+# updated_at is kept as is: a new review is not an edit of the book.
+ADJUST_BOOK_RATING = (
+    update(_books)
+    .where(_books.c.id == bindparam("b_id"))
+    .values(
+        total_reviews=_books.c.total_reviews + bindparam("b_count"),
+        rating_sum=_books.c.rating_sum + bindparam("b_sum"),
+        updated_at=_books.c.updated_at,
+    )
+)
+
+
+def book_rating_deltas(rows, sign: int = 1) -> List[dict]:
+    """
+    ADJUST_BOOK_RATING parameters (one per book) for inserted (sign=1) or
+    deleted (sign=-1) (book_id, rating) rows, for writes that bypass the
+    mapper events below
+    """
+    deltas: Dict[int, List[float]] = {}
+    for book_id, rating in rows:
+        deltas.setdefault(book_id, []).append(rating)
+    return [
+        {"b_id": book_id, "b_count": sign * len(ratings), "b_sum": sign * sum(ratings)}
+        for book_id, ratings in deltas.items()
+    ]
+
+
+def _recount_book_rating(connection, book_id: int):
+    """Recompute one book's counters from its reviews (fallback path)"""
+    book_reviews = _reviews.c.book_id == book_id
+    connection.execute(
+        update(_books)
+        .where(_books.c.id == book_id)
+        .values(
+            total_reviews=select(func.count()).where(book_reviews).scalar_subquery(),
+            rating_sum=select(func.coalesce(func.sum(_reviews.c.rating), 0.0)).where(book_reviews).scalar_subquery(),
+            updated_at=_books.c.updated_at,
+        )
+    )
+
+
+@event.listens_for(Review, "after_insert")
+def _count_new_review(mapper, connection, review):
+    connection.execute(ADJUST_BOOK_RATING, {"b_id": review.book_id, "b_count": 1, "b_sum": review.rating})
+
+
+@event.listens_for(Review, "after_update")
+def _count_changed_review(mapper, connection, review):
+    state = inspect(review)
+    book_id = state.attrs.book_id.history
+    rating = state.attrs.rating.history
+    if book_id.has_changes():
+        for changed_id in {*book_id.deleted, *book_id.added}:
+            _recount_book_rating(connection, changed_id)
+    elif rating.has_changes():
+        if rating.deleted:
+            delta = review.rating - rating.deleted[0]
+            connection.execute(ADJUST_BOOK_RATING, {"b_id": review.book_id, "b_count": 0, "b_sum": delta})
+        else:
+            # The old rating was never loaded, so the delta is unknown
+            _recount_book_rating(connection, review.book_id)
+
+
+@event.listens_for(Review, "after_delete")
+def _count_deleted_review(mapper, connection, review):
+    connection.execute(ADJUST_BOOK_RATING, {"b_id": review.book_id, "b_count": -1, "b_sum": -review.rating})
@@ -4,6 +4,8 @@ User model for the database
 import bcrypt
 from sqlalchemy import Column, String, Boolean, Text
 from sqlalchemy.orm import relationship
+
+from app.config.settings import settings
 from .base import BaseModel
 
 
@@ -46,7 +48,7 @@ class User(BaseModel):
     @staticmethod
     def get_password_hash(password: str) -> str:
         """Hash a password using bcrypt"""
-        salt = bcrypt.gensalt()
+        salt = bcrypt.gensalt(rounds=settings.BCRYPT_ROUNDS)
         return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
     
     def set_password(self, password: str):
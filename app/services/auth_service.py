@@ -1,8 +1,11 @@
 """
 Authentication service for JWT token management
 """
-from datetime import datetime, timedelta
-from typing import Optional
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from fastapi import HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -13,6 +16,28 @@ from app.models.users import User
 from app.services.user_service import UserService
 
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
+
+# In-process cache of validated tokens: token digest -> (user, expires_at).
+# Skips JWT verification and the user lookup for repeat requests.
+TOKEN_CACHE_MAXSIZE = 10000
+TOKEN_CACHE_TTL = 60  # seconds
+_token_cache: "OrderedDict[bytes, Tuple[User, float]]" = OrderedDict()
+
+
+def _token_key(token: str) -> bytes:
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+
+def invalidate_cached_token(token: str):
+    """Drop a token from the cache (e.g. on logout)"""
+    _token_cache.pop(_token_key(token), None)
+
+
+def invalidate_cached_user(user_id: int):
+    """Drop every cached token of a user (e.g. after the user is updated or deleted)"""
+    for key in [k for k, (user, _) in _token_cache.items() if user.id == user_id]:
+        del _token_cache[key]
 
 
 class AuthService:
@@ -24,9 +49,9 @@ class AuthService:
         """Create JWT access token"""
         to_encode = data.copy()
         if expires_delta:
-            expire = datetime.utcnow() + expires_delta
+            expire = datetime.now(timezone.utc) + expires_delta
         else:
-            expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+            expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
         
         to_encode.update({"exp": expire})
         encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
@@ -44,6 +69,17 @@ class AuthService:
             headers={"WWW-Authenticate": "Bearer"},
         )
         
+        key = _token_key(credentials.credentials)
+        now = time.time()
+        
+        cached = _token_cache.get(key)
+        if cached:
+            user, expires_at = cached
+            if expires_at > now:
+                _token_cache.move_to_end(key)
+                return await self.db.merge(user, load=False)
+            del _token_cache[key]
+        
         try:
             payload = jwt.decode(credentials.credentials, settings.SECRET_KEY, algorithms=["HS256"])
             username: str = payload.get("sub")
@@ -55,6 +91,11 @@ class AuthService:
         user = await self.user_service.get_user_by_username(username)
         if user is None:
             raise credentials_exception
+        
+        # Cache until the token expires, but no longer than the TTL
+        _token_cache[key] = (user, min(payload.get("exp", now), now + TOKEN_CACHE_TTL))
+        if len(_token_cache) > TOKEN_CACHE_MAXSIZE:
+            _token_cache.popitem(last=False)
         return user
     
     async def get_current_active_user(self, credentials: HTTPAuthorizationCredentials) -> User:
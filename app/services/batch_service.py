@@ -0,0 +1,155 @@
+"""
+Async request batcher (AI model calls, pipelined cache writes)
+
+Concurrent callers submit single items; a background worker coalesces them
+into batches (up to `batch_size` items or `max_wait_ms` of waiting, whichever
+comes first) and hands each batch to one handler call. This lets the LLM
+backend process many prompts in a single `generate()` call instead of one
+call per request.
+"""
+import asyncio
+import functools
+from typing import Any, Awaitable, Callable, List, Optional, Set, Tuple
+
+from loguru import logger
+
+
+class AsyncBatcher:
+    """
+    Coalesces concurrent requests into batched handler calls.
+
+    The handler receives a list of items and must return a list of results
+    in the same order. Up to `max_concurrency` batches are handled at once,
+    so one slow batch doesn't hold up the queue behind it.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[List[Any]], Awaitable[List[Any]]],
+        batch_size: int = 16,
+        max_wait_ms: int = 20,
+        max_concurrency: int = 1
+    ):
+        self._handler = handler
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.max_concurrency = max_concurrency
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._in_flight: Set[asyncio.Task] = set()
+
+    @property
+    def is_running(self) -> bool:
+        return (
+            self._task is not None
+            and not self._task.done()
+            and self._loop is asyncio.get_running_loop()
+        )
+
+    def start(self):
+        """Start the background worker (call this once at startup)"""
+        if self.is_running:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._task = self._loop.create_task(self._run())
+        logger.info(
+            f"Batcher started (batch_size={self.batch_size}, "
+            f"max_wait_ms={int(self.max_wait * 1000)})"
+        )
+
+    async def stop(self):
+        """Stop the background worker, finish batches in flight and fail any pending requests"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._in_flight:
+            await asyncio.gather(*self._in_flight, return_exceptions=True)
+
+        while self._queue is not None and not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            if future is not None and not future.done():
+                future.set_exception(RuntimeError("Batcher stopped"))
+        logger.info("Batcher stopped")
+
+    async def submit(self, item: Any) -> Any:
+        """Submit a single item and wait for its result"""
+        # Started lazily as well, so the batcher works without the app lifespan
+        self.start()
+        future = self._loop.create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    def submit_nowait(self, item: Any):
+        """Queue a single item without waiting for (or receiving) its result"""
+        self.start()
+        self._queue.put_nowait((item, None))
+
+    async def flush(self):
+        """Wait until every item queued so far has been handled"""
+        if self.is_running:
+            await self._queue.join()
+
+    async def _run(self):
+        """Worker loop: collect a batch, then dispatch it"""
+        while True:
+            batch = [await self._queue.get()]
+            deadline = self._loop.time() + self.max_wait
+
+            while len(batch) < self.batch_size:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            # Wait for a free slot, then handle the batch in the background
+            try:
+                await self._slots.acquire()
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    if future is not None and not future.done():
+                        future.set_exception(RuntimeError("Batcher stopped"))
+                    self._queue.task_done()
+                raise
+            task = self._loop.create_task(self._dispatch(batch))
+            self._in_flight.add(task)
+            task.add_done_callback(functools.partial(self._dispatch_done, self._queue, len(batch)))
+
+    def _dispatch_done(self, queue: asyncio.Queue, size: int, task: asyncio.Task):
+        """Free the batch's slot and mark its items handled (for flush())"""
+        self._in_flight.discard(task)
+        self._slots.release()
+        for _ in range(size):
+            queue.task_done()
+
+    async def _dispatch(self, batch: List[Tuple[Any, asyncio.Future]]):
+        """Run the handler for one batch and resolve the waiting futures"""
+        items = [item for item, _ in batch]
+        try:
+            results = await self._handler(items)
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"Batch handler returned {len(results)} results for {len(items)} items"
+                )
+        except Exception as e:
+            logger.error(f"Error processing batch of {len(items)}: {str(e)}")
+            for _, future in batch:
+                if future is not None and not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            # Skip callers that went away (e.g. client disconnected) or never waited
+            if future is not None and not future.done():
+                future.set_result(result)
@@ -1,19 +1,49 @@
 """
 Book service for business logic
 """
-from typing import List, Optional
+from typing import AsyncIterator, Dict, List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, or_, desc
+from sqlalchemy import Row, select, update, delete, or_, desc
+from sqlalchemy.orm import raiseload, selectinload
 
+from app.config.settings import settings
 from app.models.books import Book
+from app.models.reviews import Review
 from app.api.schemas import BookCreate, BookUpdate
-from app.services.llama_service import LlamaService
+from app.services.llama_service import llama_service
+from app.services.cache_service import cache_service
+from app.services.similarity_index import book_document, similarity_index
+
+
+# Rows fetched per round trip when streaming large listings
+STREAM_BATCH_SIZE = 100
+
+# Columns serialized by BookResponse; listing them skips ORM object hydration
+BOOK_LIST_COLUMNS = (
+    Book.id, Book.title, Book.author, Book.genre, Book.year_published,
+    Book.summary, Book.created_at, Book.updated_at,
+)
 
 
 class BookService:
     def __init__(self, db: AsyncSession):
         self.db = db
-        self.llama_service = LlamaService()
+        self.llama_service = llama_service
+
+    async def _invalidate_caches(self, new_book: Optional[Book] = None):
+        """
+        Book content changed: update the similarity index (a new book is
+        appended, anything else forces a rebuild) and drop cached listings
+        and similar books
+        """
+        if new_book is not None:
+            similarity_index.add(new_book.id, book_document(new_book.genre, new_book.author, new_book.summary))
+        else:
+            similarity_index.invalidate()
+        await cache_service.clear_patterns(
+            f"{cache_service.PREFIX_SIMILAR}*",
+            f"{cache_service.PREFIX_BOOK_LIST}*",
+        )
 
     async def create_book(self, book_data: BookCreate) -> Book:
         """Create a new book"""
@@ -21,18 +51,21 @@ class BookService:
         self.db.add(book)
         await self.db.commit()
         await self.db.refresh(book)
+        await self._invalidate_caches(new_book=book)
         return book
 
-    async def get_books(
-        self, 
-        skip: int = 0, 
-        limit: int = 100,
-        genre: Optional[str] = None,
-        author: Optional[str] = None,
-        search: Optional[str] = None
-    ) -> List[Book]:
-        """Get books with optional filtering"""
-        query = select(Book)
+    def _books_query(
+        self,
+        skip: int,
+        limit: int,
+        genre: Optional[str],
+        author: Optional[str],
+        search: Optional[str],
+        after_id: Optional[int] = None,
+        columns: Optional[tuple] = None
+    ):
+        """Build the filtered book listing query (whole entities unless columns are given)"""
+        query = select(*columns) if columns else select(Book)
         
         if genre:
             query = query.where(Book.genre.ilike(f"%{genre}%"))
@@ -49,37 +82,91 @@ class BookService:
                 )
             )
         
-        query = query.offset(skip).limit(limit)
+        # Keyset pagination: seeking past after_id uses the primary key index
+        # instead of scanning and discarding `skip` rows
+        query = query.order_by(Book.id)
+        if after_id is not None:
+            query = query.where(Book.id > after_id)
+        elif skip:
+            query = query.offset(skip)
+        
+        return query.limit(limit)
+
+    async def get_books(
+        self, 
+        skip: int = 0, 
+        limit: int = 100,
+        genre: Optional[str] = None,
+        author: Optional[str] = None,
+        search: Optional[str] = None,
+        include_reviews: bool = False,
+        after_id: Optional[int] = None
+    ) -> List[Book]:
+        """Get books with optional filtering"""
+        query = self._books_query(skip, limit, genre, author, search, after_id=after_id)
+        
+        if include_reviews:
+            # One extra IN query for all reviews instead of one query per book
+            query = query.options(selectinload(Book.reviews))
+        else:
+            # Fail loudly instead of lazy-loading reviews one book at a time
+            query = query.options(raiseload(Book.reviews))
+        
         result = await self.db.execute(query)
         return result.scalars().all()
 
-    async def get_book_by_id(self, book_id: int) -> Optional[Book]:
+    async def stream_books(
+        self, 
+        skip: int = 0, 
+        limit: int = 100,
+        genre: Optional[str] = None,
+        author: Optional[str] = None,
+        search: Optional[str] = None,
+        after_id: Optional[int] = None
+    ) -> AsyncIterator[Row]:
+        """Stream book rows (plain column tuples, not ORM objects) from a server-side cursor"""
+        query = self._books_query(
+            skip, limit, genre, author, search, after_id=after_id, columns=BOOK_LIST_COLUMNS
+        )
+        result = await self.db.stream(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+        async for row in result:
+            yield row
+
+    async def get_book_by_id(self, book_id: int, include_reviews: bool = False) -> Optional[Book]:
         """Get a book by ID"""
-        query = select(Book).where(Book.id == book_id)
+        query = select(Book).where(Book.id == book_id).options(
+            selectinload(Book.reviews) if include_reviews else raiseload(Book.reviews)
+        )
         result = await self.db.execute(query)
         return result.scalar_one_or_none()
 
     async def update_book(self, book_id: int, book_data: BookUpdate) -> Optional[Book]:
-        """Update a book"""
-        book = await self.get_book_by_id(book_id)
+        """Update a book in a single UPDATE ... RETURNING statement"""
+        values = book_data.model_dump(exclude_unset=True)
+        if not values:
+            return await self.get_book_by_id(book_id)
+        
+        query = update(Book).where(Book.id == book_id).values(**values).returning(Book)
+        result = await self.db.execute(query)
+        book = result.scalar_one_or_none()
         if not book:
             return None
         
-        for field, value in book_data.model_dump(exclude_unset=True).items():
-            setattr(book, field, value)
-        
         await self.db.commit()
-        await self.db.refresh(book)
+        await self._invalidate_caches()
         return book
 
     async def delete_book(self, book_id: int) -> bool:
-        """Delete a book"""
-        book = await self.get_book_by_id(book_id)
-        if not book:
+        """Delete a book and its reviews without loading either"""
+        # Explicit so SQLite (no FK enforcement) matches PostgreSQL's ON DELETE CASCADE
+        await self.db.execute(delete(Review).where(Review.book_id == book_id))
+        result = await self.db.execute(delete(Book).where(Book.id == book_id))
+        if result.rowcount == 0:
+            await self.db.rollback()
             return False
         
-        await self.db.delete(book)
         await self.db.commit()
+        await self._invalidate_caches()
         return True
 
     async def generate_summary(self, book_id: int) -> Optional[str]:
@@ -88,12 +175,35 @@ class BookService:
         if not book:
             return None
         
-        # Create prompt for summarization
-        prompt = f"Title: {book.title}\nAuthor: {book.author}\nSummary: {book.summary or 'No summary available'}"
-        
-        generated_summary = await self.llama_service.generate_summary(prompt)
+        generated_summary = await self.llama_service.generate_summary(self._summary_prompt(book))
         return generated_summary
 
+    async def generate_summaries(self, book_ids: List[int]) -> Dict[int, str]:
+        """
+        Generate AI summaries for several books.
+        Loads all books in one query and sends the prompts to the model in
+        batches of SUMMARY_BATCH_SIZE, which also caps concurrent API calls.
+        Books that don't exist are left out of the result.
+        """
+        query = select(Book).where(Book.id.in_(book_ids)).order_by(Book.id)
+        result = await self.db.execute(query)
+        books = result.scalars().all()
+        
+        prompts = [self._summary_prompt(book) for book in books]
+        batch_size = settings.SUMMARY_BATCH_SIZE
+        summaries = []
+        for start in range(0, len(prompts), batch_size):
+            summaries.extend(
+                await self.llama_service.generate_summary_batch(prompts[start:start + batch_size])
+            )
+        
+        return {book.id: summary for book, summary in zip(books, summaries)}
+
+    @staticmethod
+    def _summary_prompt(book: Book) -> str:
+        """Create prompt for summarization"""
+        return f"Title: {book.title}\nAuthor: {book.author}\nSummary: {book.summary or 'No summary available'}"
+
     async def get_books_for_recommendations(self, limit: int = 50) -> List[Book]:
         """Get books for recommendations"""
         query = select(Book).order_by(desc(Book.id)).limit(limit)
@@ -0,0 +1,57 @@
+"""
+Caching decorator for async service methods
+
+Wraps a coroutine so its result is read from / written to Redis under a key
+built from the call arguments, e.g.:
+
+    @cached(key_template="popular:{genre}:{limit}", ttl=120)
+    async def get_popular_books(self, limit: int = 10, genre: Optional[str] = None):
+        ...
+"""
+import functools
+import inspect
+from typing import Any, Callable, Optional
+
+from loguru import logger
+
+from app.services.cache_service import cache_service
+
+
+def cached(
+    key_template: str,
+    ttl: int,
+    dump: Optional[Callable[[Any], Any]] = None,
+    load: Optional[Callable[[Any], Any]] = None
+):
+    """
+    Cache the result of an async function in Redis.
+
+    Args:
+        key_template: str.format template filled from the call's arguments
+        ttl: Time to live in seconds
+        dump: Optional converter from the result to a JSON-serializable value
+        load: Optional converter from the cached value back to the result type
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = key_template.format(**bound.arguments)
+
+            cached_value = await cache_service.get(key)
+            if cached_value is not None:
+                logger.info(f"Cache HIT for {func.__name__} ({key})")
+                return load(cached_value) if load else cached_value
+
+            result = await func(*args, **kwargs)
+
+            if await cache_service.set(key, dump(result) if dump else result, ttl):
+                logger.info(f"Cache SET for {func.__name__} ({key})")
+            return result
+
+        return wrapper
+
+    return decorator
@@ -6,15 +6,62 @@ It caches:
 - Book recommendations (TTL: 60 seconds)
 - Popular books list (TTL: 120 seconds)
 - AI-generated summaries (TTL: 300 seconds)
+- Book list responses (TTL: 60 seconds)
 """
-import json
+import asyncio
+import fnmatch
+import functools
 import hashlib
-from typing import Optional, Any, List
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
 from datetime import timedelta
+import msgspec
 import redis.asyncio as redis
+from redis.asyncio.connection import DefaultParser
+import zstandard
 from loguru import logger
 
 from app.config.settings import settings
+from app.services.batch_service import AsyncBatcher
+
+# Cached values are stored as MessagePack; types msgpack lacks (e.g. naive
+# datetimes) are stored as strings, like json.dumps(default=str) did
+_encoder = msgspec.msgpack.Encoder(enc_hook=str)
+_decoder = msgspec.msgpack.Decoder()
+
+# Payloads larger than this are zstd-compressed; a one-byte header says which
+COMPRESS_THRESHOLD = 512
+_RAW = b"R"
+_ZSTD = b"Z"
+_compressor = zstandard.ZstdCompressor(level=3)
+_decompressor = zstandard.ZstdDecompressor()
+
+
+def _pack(value: Any) -> bytes:
+    """Encode a value for Redis (MessagePack, compressed when large)"""
+    payload = _encoder.encode(value)
+    if len(payload) > COMPRESS_THRESHOLD:
+        return _ZSTD + _compressor.compress(payload)
+    return _RAW + payload
+
+
+def _unpack(data: bytes) -> Any:
+    """Decode a value written by _pack"""
+    payload = data[1:]
+    if data[:1] == _ZSTD:
+        payload = _decompressor.decompress(payload)
+    return _decoder.decode(payload)
+
+# Keys longer than this are replaced by a hash
+MAX_KEY_DATA_LENGTH = 64
+
+
+@functools.lru_cache(maxsize=4096)
+def _hash_key(key_data: str) -> str:
+    """Short stable digest for long cache keys (memoized: hot keys repeat)"""
+    return hashlib.blake2b(key_data.encode(), digest_size=16).hexdigest()
 
 
 class CacheService:
@@ -28,30 +75,72 @@ class CacheService:
     TTL_POPULAR_BOOKS = 120       # 2 minutes
     TTL_AI_SUMMARY = 300          # 5 minutes
     TTL_SIMILAR_BOOKS = 180       # 3 minutes
+    TTL_BOOK_LIST = 60            # 1 minute
     
     # Cache key prefixes
     PREFIX_RECOMMENDATIONS = "rec:"
     PREFIX_POPULAR = "popular:"
     PREFIX_SUMMARY = "summary:"
     PREFIX_SIMILAR = "similar:"
+    PREFIX_BOOK_LIST = "books:"
+    
+    # Hot read-only values also kept in process memory, saving the Redis round
+    # trip; the short TTL bounds how stale other workers' copies can get
+    LOCAL_CACHE_PREFIXES = (PREFIX_SUMMARY, PREFIX_POPULAR)
+    LOCAL_CACHE_MAXSIZE = 1024
+    LOCAL_CACHE_TTL = 30          # seconds
+    
+    # Plain set() calls are queued and written in pipelined batches
+    WRITE_BATCH_SIZE = 128
+    WRITE_MAX_WAIT_MS = 5
+    
+    # get_cache_stats results are reused for this long (dashboards poll often)
+    STATS_TTL = 1.0               # seconds
+    
+    # Keys fetched per SCAN round trip / removed per UNLINK call
+    SCAN_BATCH_SIZE = 1000
+    
+    # Single-flight locks for expensive values (AI summaries)
+    LOCK_TTL = 30                 # seconds; longer than a model call
+    LOCK_POLL_INTERVAL = 0.1      # seconds between checks while waiting
+    
+    # Delete a lock only if we still own it (it may have expired and been re-taken)
+    _RELEASE_LOCK_SCRIPT = """
+    if redis.call("get", KEYS[1]) == ARGV[1] then
+        return redis.call("del", KEYS[1])
+    end
+    return 0
+    """
     
     def __init__(self):
         self._redis: Optional[redis.Redis] = None
         self._connected = False
+        self._local: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._stats_cache: Optional[Tuple[float, dict]] = None
+        # Values queued by set() but not yet in Redis (read by this worker's get())
+        self._unflushed: Dict[str, Tuple[bytes, Any]] = {}
+        self._writer = AsyncBatcher(
+            self._write_batch,
+            batch_size=self.WRITE_BATCH_SIZE,
+            max_wait_ms=self.WRITE_MAX_WAIT_MS
+        )
     
     async def connect(self) -> bool:
         """Initialize Redis connection"""
         try:
             redis_url = getattr(settings, 'REDIS_URL', 'redis://localhost:6379/0')
-            self._redis = redis.from_url(
+            pool = redis.BlockingConnectionPool.from_url(
                 redis_url,
-                encoding="utf-8",
-                decode_responses=True
+                max_connections=settings.REDIS_POOL_SIZE,
+                timeout=settings.REDIS_POOL_TIMEOUT,
+                decode_responses=False  # values are binary MessagePack
             )
+            self._redis = redis.Redis(connection_pool=pool)
             # Test connection
             await self._redis.ping()
             self._connected = True
-            logger.info(f"Redis cache connected: {redis_url}")
+            # DefaultParser is the C hiredis parser whenever hiredis is installed
+            logger.info(f"Redis cache connected: {redis_url} (parser: {DefaultParser.__name__})")
             return True
         except Exception as e:
             logger.warning(f"Redis cache not available: {e}. Running without cache.")
@@ -60,8 +149,9 @@ class CacheService:
     
     async def disconnect(self):
         """Close Redis connection"""
+        await self._writer.stop()
         if self._redis:
-            await self._redis.close()
+            await self._redis.close(close_connection_pool=True)
             self._connected = False
             logger.info("Redis cache disconnected")
     
@@ -72,43 +162,151 @@ class CacheService:
     def _generate_key(self, prefix: str, *args) -> str:
         """Generate a cache key from prefix and arguments"""
         key_data = ":".join(str(arg) for arg in args if arg is not None)
-        if len(key_data) > 100:
-            # Hash long keys
-            key_data = hashlib.md5(key_data.encode()).hexdigest()
+        if len(key_data) > MAX_KEY_DATA_LENGTH:
+            key_data = _hash_key(key_data)
         return f"{prefix}{key_data}"
     
+    def _local_get(self, key: str) -> Optional[Any]:
+        """Get a value from the in-process cache (None if missing or expired)"""
+        entry = self._local.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._local[key]
+            return None
+        return value
+    
+    def _local_set(self, key: str, value: Any, ttl: int):
+        """Keep a copy of a hot value in process memory"""
+        if not key.startswith(self.LOCAL_CACHE_PREFIXES):
+            return
+        self._local[key] = (time.monotonic() + min(ttl, self.LOCAL_CACHE_TTL), value)
+        if len(self._local) > self.LOCAL_CACHE_MAXSIZE:
+            self._local.popitem(last=False)
+    
+    def _memory_get(self, key: str) -> Optional[Any]:
+        """Value held by this process: a queued write or an in-process cache entry"""
+        pending = self._unflushed.get(key)
+        if pending is not None:
+            return pending[1]
+        return self._local_get(key)
+    
+    def _local_clear(self, patterns: Tuple[str, ...]):
+        """Drop in-process entries matching any of the glob patterns"""
+        for key in [k for k in self._local if any(fnmatch.fnmatchcase(k, p) for p in patterns)]:
+            del self._local[key]
+    
     async def get(self, key: str) -> Optional[Any]:
         """Get value from cache"""
         if not self._connected:
             return None
+        value = self._memory_get(key)
+        if value is not None:
+            return value
         try:
             data = await self._redis.get(key)
-            if data:
+            if data is not None:
                 logger.debug(f"Cache HIT: {key}")
-                return json.loads(data)
+                value = _unpack(data)
+                self._local_set(key, value, self.LOCAL_CACHE_TTL)
+                return value
             logger.debug(f"Cache MISS: {key}")
             return None
         except Exception as e:
             logger.error(f"Cache get error: {e}")
             return None
     
-    async def set(self, key: str, value: Any, ttl: int = 60) -> bool:
-        """Set value in cache with TTL"""
+    async def set(self, key: str, value: Any, ttl: int = 60, wait: bool = False) -> bool:
+        """
+        Set value in cache with TTL.
+        By default the write is queued and sent with other writes in one
+        pipeline, so the caller does not wait for Redis. This worker reads the
+        queued value back at once, and delete()/clear_patterns() flush the
+        queue first so a queued write can't land after an invalidation. Other
+        workers see it a few ms later: pass wait=True when they must be able to
+        read it as soon as this returns.
+        """
         if not self._connected:
             return False
         try:
-            await self._redis.setex(key, ttl, json.dumps(value, default=str))
+            payload = _pack(value)
+            self._local_set(key, value, ttl)
+            if wait:
+                await self._redis.setex(key, ttl, payload)
+            else:
+                self._unflushed[key] = (payload, value)
+                self._writer.submit_nowait((key, payload, ttl))
             logger.debug(f"Cache SET: {key} (TTL: {ttl}s)")
             return True
         except Exception as e:
             logger.error(f"Cache set error: {e}")
             return False
     
+    async def _write_batch(self, items: List[Tuple[str, bytes, int]]) -> List[Any]:
+        """Write queued set() calls in one pipeline (batch handler)"""
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                for key, payload, ttl in items:
+                    pipe.setex(key, ttl, payload)
+                return await pipe.execute()
+        finally:
+            for key, payload, _ in items:
+                # Keep entries that a newer set() replaced while this was in flight
+                if self._unflushed.get(key, (None,))[0] is payload:
+                    del self._unflushed[key]
+    
+    async def flush_writes(self):
+        """Wait until every queued set() has reached Redis"""
+        await self._writer.flush()
+    
+    async def mget(self, keys: List[str]) -> List[Optional[Any]]:
+        """Get several values from cache in one round trip (None for misses)"""
+        if not self._connected or not keys:
+            return [None] * len(keys)
+        results = [self._memory_get(key) for key in keys]
+        missing = [i for i, value in enumerate(results) if value is None]
+        if not missing:
+            return results
+        try:
+            values = await self._redis.mget([keys[i] for i in missing])
+            for i, data in zip(missing, values):
+                if data is not None:
+                    results[i] = _unpack(data)
+                    self._local_set(keys[i], results[i], self.LOCAL_CACHE_TTL)
+            return results
+        except Exception as e:
+            logger.error(f"Cache mget error: {e}")
+            return [None] * len(keys)
+    
+    async def get_raw(self, key: str) -> Optional[bytes]:
+        """Get a pre-serialized value (e.g. a JSON response body) from cache"""
+        if not self._connected:
+            return None
+        try:
+            return await self._redis.get(key)
+        except Exception as e:
+            logger.error(f"Cache get error: {e}")
+            return None
+    
+    async def set_raw(self, key: str, value: bytes, ttl: int = 60) -> bool:
+        """Set a pre-serialized value in cache with TTL (no MessagePack encoding)"""
+        if not self._connected:
+            return False
+        try:
+            await self._redis.setex(key, ttl, value)
+            return True
+        except Exception as e:
+            logger.error(f"Cache set error: {e}")
+            return False
+    
     async def delete(self, key: str) -> bool:
         """Delete key from cache"""
+        self._local.pop(key, None)
         if not self._connected:
             return False
         try:
+            await self.flush_writes()
             await self._redis.delete(key)
             logger.debug(f"Cache DELETE: {key}")
             return True
@@ -118,15 +316,46 @@ class CacheService:
     
     async def clear_pattern(self, pattern: str) -> int:
         """Clear all keys matching pattern"""
-        if not self._connected:
+        return await self.clear_patterns(pattern)
+    
+    async def clear_patterns(self, *patterns: str) -> int:
+        """
+        Clear all keys matching any of the patterns.
+        Uses incremental SCAN instead of KEYS and UNLINK instead of DEL so
+        Redis frees memory in the background without blocking other clients.
+        Each round trip is one pipeline carrying the next SCAN step of every
+        unfinished pattern plus the UNLINK of the keys found in the last step.
+        """
+        self._local_clear(patterns)
+        if not self._connected or not patterns:
             return 0
         try:
-            keys = await self._redis.keys(pattern)
-            if keys:
-                deleted = await self._redis.delete(*keys)
-                logger.info(f"Cache CLEAR: {pattern} ({deleted} keys)")
-                return deleted
-            return 0
+            await self.flush_writes()
+            cursors = {pattern: 0 for pattern in patterns}
+            found = []
+            deleted = 0
+            while cursors or found:
+                scanning = list(cursors.items())
+                async with self._redis.pipeline(transaction=False) as pipe:
+                    for pattern, cursor in scanning:
+                        pipe.scan(cursor, match=pattern, count=self.SCAN_BATCH_SIZE)
+                    if found:
+                        pipe.unlink(*found)
+                    results = await pipe.execute()
+                
+                if found:
+                    deleted += results[-1]
+                found = []
+                for (pattern, _), (cursor, keys) in zip(scanning, results):
+                    found.extend(keys)
+                    if cursor == 0:
+                        del cursors[pattern]
+                    else:
+                        cursors[pattern] = cursor
+            
+            if deleted:
+                logger.info(f"Cache CLEAR: {', '.join(patterns)} ({deleted} keys)")
+            return deleted
         except Exception as e:
             logger.error(f"Cache clear error: {e}")
             return 0
@@ -157,13 +386,95 @@ class CacheService:
     
     async def get_ai_summary(self, content_hash: str) -> Optional[str]:
         """Get cached AI summary"""
-        key = self._generate_key(self.PREFIX_SUMMARY, content_hash)
-        return await self.get(key)
+        return await self.get(self._summary_key(content_hash))
+    
+    async def mget_ai_summaries(self, content_hashes: List[str]) -> List[Optional[str]]:
+        """Get several cached AI summaries at once"""
+        return await self.mget([self._summary_key(content_hash) for content_hash in content_hashes])
     
     async def set_ai_summary(self, content_hash: str, summary: str) -> bool:
         """Cache AI-generated summary"""
-        key = self._generate_key(self.PREFIX_SUMMARY, content_hash)
-        return await self.set(key, summary, self.TTL_AI_SUMMARY)
+        # Waited on: single-flight waiters poll for it as soon as the lock is released
+        return await self.set(self._summary_key(content_hash), summary, self.TTL_AI_SUMMARY, wait=True)
+    
+    def _summary_key(self, content_hash: str) -> str:
+        return self._generate_key(self.PREFIX_SUMMARY, content_hash)
+    
+    async def acquire_lock(self, key: str, ttl: int = LOCK_TTL) -> Optional[str]:
+        """
+        Try to take a short-lived lock (SET NX EX) on key.
+        Returns the owner token, or None if someone else holds it.
+        Without Redis there is nothing to coordinate, so it always succeeds.
+        """
+        token = uuid.uuid4().hex
+        if not self._connected:
+            return token
+        try:
+            if await self._redis.set(f"{key}:lock", token, nx=True, ex=ttl):
+                return token
+            return None
+        except Exception as e:
+            logger.error(f"Cache lock error: {e}")
+            return token
+    
+    async def release_lock(self, key: str, token: str):
+        """Release a lock taken with acquire_lock"""
+        if not self._connected:
+            return
+        try:
+            await self._redis.eval(self._RELEASE_LOCK_SCRIPT, 1, f"{key}:lock", token)
+        except Exception as e:
+            logger.error(f"Cache unlock error: {e}")
+    
+    async def wait_for(self, key: str, timeout: float = LOCK_TTL) -> Optional[Any]:
+        """Poll for a value another worker is computing; None on timeout"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(self.LOCK_POLL_INTERVAL)
+            value = await self.get(key)
+            if value is not None:
+                return value
+        return None
+    
+    async def lock_ai_summary(self, content_hash: str) -> Optional[str]:
+        """Claim the right to generate a summary (see acquire_lock)"""
+        return await self.acquire_lock(self._summary_key(content_hash))
+    
+    async def unlock_ai_summary(self, content_hash: str, token: str):
+        await self.release_lock(self._summary_key(content_hash), token)
+    
+    async def wait_for_ai_summary(self, content_hash: str) -> Optional[str]:
+        """Wait for a summary being generated elsewhere"""
+        return await self.wait_for(self._summary_key(content_hash))
+    
+    async def get_or_set_summary(
+        self, content_hash: str, compute: Callable[[], Awaitable[str]]
+    ) -> str:
+        """
+        Get a cached AI summary, or generate it exactly once across workers.
+        Concurrent misses for the same content wait for the first caller's
+        result instead of each calling the model (cache stampede).
+        """
+        cached = await self.get_ai_summary(content_hash)
+        if cached:
+            logger.info(f"Cache HIT for AI summary (hash={content_hash[:8]}...)")
+            return cached
+        
+        token = await self.lock_ai_summary(content_hash)
+        if token is None:
+            summary = await self.wait_for_ai_summary(content_hash)
+            if summary:
+                return summary
+            # The owner died or is too slow: generate it ourselves
+            return await compute()
+        
+        try:
+            summary = await compute()
+            if await self.set_ai_summary(content_hash, summary):
+                logger.info(f"Cache SET for AI summary (hash={content_hash[:8]}...)")
+            return summary
+        finally:
+            await self.unlock_ai_summary(content_hash, token)
     
     async def get_similar_books(self, book_id: int, limit: int = 5) -> Optional[List]:
         """Get cached similar books"""
@@ -175,25 +486,32 @@ class CacheService:
         key = self._generate_key(self.PREFIX_SIMILAR, book_id, limit)
         return await self.set(key, data, self.TTL_SIMILAR_BOOKS)
     
-    async def invalidate_book_caches(self, book_id: Optional[int] = None):
+    async def invalidate_book_caches(self, *book_ids: int):
         """Invalidate book-related caches when data changes"""
-        await self.clear_pattern(f"{self.PREFIX_POPULAR}*")
-        if book_id:
-            await self.clear_pattern(f"{self.PREFIX_SIMILAR}{book_id}*")
-        await self.clear_pattern(f"{self.PREFIX_RECOMMENDATIONS}*")
+        patterns = [f"{self.PREFIX_POPULAR}*", f"{self.PREFIX_RECOMMENDATIONS}*"]
+        patterns.extend(f"{self.PREFIX_SIMILAR}{book_id}:*" for book_id in book_ids if book_id)
+        await self.clear_patterns(*patterns)
     
     async def get_cache_stats(self) -> dict:
         """Get cache statistics"""
         if not self._connected:
             return {"status": "disconnected"}
+        now = time.monotonic()
+        if self._stats_cache and now - self._stats_cache[0] < self.STATS_TTL:
+            return self._stats_cache[1]
         try:
-            info = await self._redis.info("stats")
-            return {
+            async with self._redis.pipeline(transaction=False) as pipe:
+                pipe.info("stats")
+                pipe.dbsize()
+                info, keys = await pipe.execute()
+            stats = {
                 "status": "connected",
                 "hits": info.get("keyspace_hits", 0),
                 "misses": info.get("keyspace_misses", 0),
-                "keys": await self._redis.dbsize()
+                "keys": keys
             }
+            self._stats_cache = (now, stats)
+            return stats
         except Exception as e:
             return {"status": "error", "error": str(e)}
 
@@ -2,57 +2,122 @@
 Llama3 AI service for generating summaries and recommendations
 """
 import asyncio
+import itertools
+import re
 import httpx
 from typing import List, Optional
-from transformers import AutoTokenizer, AutoModelForCausalLM, pipeline
+from transformers import AutoTokenizer, AutoModelForCausalLM
 import torch
 from loguru import logger
 
 from app.config.settings import settings
+from app.services.batch_service import AsyncBatcher
+
+OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+
+# Local model prompts; the summary prefix is tokenized once at load time
+SUMMARY_PROMPT_PREFIX = "Summarize the following text in 2-3 sentences:\n"
+SUMMARY_PROMPT = SUMMARY_PROMPT_PREFIX + "{text}\nSummary:"
+RECOMMENDATION_PROMPT = "User preferences: {preferences}\nAvailable books: {books}\nRecommendation reasoning:"
+
+# Tokens generated per prompt by the local model
+MAX_NEW_TOKENS = 100
+
+# A sentence: text up to and including its terminator (or the end of the text)
+_SENTENCE_RE = re.compile(r"[^.!?]+(?:[.!?]|$)")
 
 
 class LlamaService:
     def __init__(self):
         self.model = None
         self.tokenizer = None
-        self.pipeline = None
+        self._summary_prefix_ids: List[int] = []
         self._initialized = False
+        self._init_lock = asyncio.Lock()
         self.use_openrouter = bool(settings.OPENROUTER_API_KEY)
+        self._http: Optional[httpx.AsyncClient] = None
+        # Every local-model prompt goes through this batcher: concurrent calls
+        # share batched generate() calls, and one batch runs at a time
+        self._prompt_batcher = AsyncBatcher(
+            self._generate_prompt_batch,
+            batch_size=settings.LLAMA_BATCH_SIZE,
+            max_wait_ms=settings.LLAMA_BATCH_MAX_WAIT_MS,
+            max_concurrency=1
+        )
     
     async def initialize(self):
-        """Initialize the Llama model (call this once at startup)"""
+        """
+        Initialize the Llama model (call this once at startup).
+        Safe to call concurrently: the weights are loaded once per process,
+        in a worker thread so the event loop keeps serving requests.
+        """
+        if self.use_openrouter:
+            self._client()
+        
         if self._initialized:
             return
         
-        try:
-            logger.info(f"Loading Llama model: {settings.LLAMA_MODEL_PATH}")
+        async with self._init_lock:
+            if self._initialized:
+                return
             
-            # For this demo, we'll use a smaller model that's easier to run locally
-            # In production, you would use the actual Llama3 model
-            model_name = "microsoft/DialoGPT-medium"  # Fallback model for demo
-            
-            self.tokenizer = AutoTokenizer.from_pretrained(model_name)
-            self.model = AutoModelForCausalLM.from_pretrained(model_name)
-            
-            # Set up generation pipeline
-            self.pipeline = pipeline(
-                "text-generation",
-                model=self.model,
-                tokenizer=self.tokenizer,
-                device=0 if torch.cuda.is_available() else -1,
-                do_sample=True,
-                temperature=settings.LLAMA_TEMPERATURE,
-                max_length=settings.LLAMA_MAX_LENGTH,
-                pad_token_id=self.tokenizer.eos_token_id
+            try:
+                logger.info(f"Loading Llama model: {settings.LLAMA_MODEL_PATH}")
+                await asyncio.to_thread(self._load_model)
+                self._initialized = True
+                logger.info("Llama model initialized successfully")
+                
+            except Exception as e:
+                logger.error(f"Failed to initialize Llama model: {str(e)}")
+                # Fallback to a simple rule-based system
+                self._initialized = False
+    
+    def _client(self) -> httpx.AsyncClient:
+        """Shared OpenRouter client, so calls reuse pooled keep-alive connections"""
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                http2=True,
+                timeout=30.0,
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+                headers={
+                    "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
+                    "Content-Type": "application/json",
+                }
             )
-            
-            self._initialized = True
-            logger.info("Llama model initialized successfully")
-            
-        except Exception as e:
-            logger.error(f"Failed to initialize Llama model: {str(e)}")
-            # Fallback to a simple rule-based system
-            self._initialized = False
+        return self._http
+    
+    async def close(self):
+        """Stop the prompt batcher and close the OpenRouter client (call this once at shutdown)"""
+        await self._prompt_batcher.stop()
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+    
+    def _load_model(self):
+        """Load tokenizer and weights (blocking)"""
+        # For this demo, we'll use a smaller model that's easier to run locally
+        # In production, you would use the actual Llama3 model
+        model_name = "microsoft/DialoGPT-medium"  # Fallback model for demo
+        
+        use_cuda = torch.cuda.is_available()
+        if use_cuda:
+            dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+        else:
+            dtype = torch.float32  # half precision is slow or unsupported on CPU
+        
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.model = AutoModelForCausalLM.from_pretrained(model_name, torch_dtype=dtype)
+        self.model.eval()
+        if use_cuda:
+            self.model.to("cuda")
+            # Compile the forward pass; generate() calls it once per token
+            self.model.forward = torch.compile(self.model.forward, mode="reduce-overhead")
+        
+        # Batched generation needs a pad token; decoder-only models pad on the left
+        self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.tokenizer.padding_side = "left"
+        
+        self._summary_prefix_ids = self.tokenizer.encode(SUMMARY_PROMPT_PREFIX)
 
     async def generate_summary(self, text: str) -> str:
         """Generate a summary of the given text"""
@@ -64,28 +129,42 @@ class LlamaService:
             return self._fallback_summary(text)
         
         try:
-            prompt = f"Summarize the following text in 2-3 sentences:\n{text[:1000]}\nSummary:"
-            
-            # Run in thread to avoid blocking
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                None, 
-                self._generate_text, 
-                prompt
-            )
-            
-            # Extract summary from result
-            if result and len(result) > 0:
-                generated = result[0]['generated_text']
-                summary = generated.split("Summary:")[-1].strip()
-                return summary[:500]  # Limit summary length
-            
-            return self._fallback_summary(text)
+            prompt = SUMMARY_PROMPT.format(text=text[:1000])
+            summary = (await self._prompt_batcher.submit(prompt)).strip()
+            return summary[:500] or self._fallback_summary(text)  # Limit summary length
             
         except Exception as e:
             logger.error(f"Error generating summary: {str(e)}")
             return self._fallback_summary(text)
 
+    async def generate_summary_batch(self, texts: List[str]) -> List[str]:
+        """Generate summaries for several texts in as few model calls as possible"""
+        if self.use_openrouter:
+            # The chat completions API takes one prompt per request
+            return list(await asyncio.gather(
+                *(self._generate_summary_openrouter(text) for text in texts)
+            ))
+        
+        if not self._initialized:
+            return [self._fallback_summary(text) for text in texts]
+        
+        try:
+            # Through the shared batcher, so generate() calls never overlap
+            # (compiled CUDA-graph replay is not thread-safe)
+            results = await asyncio.gather(*(
+                self._prompt_batcher.submit(SUMMARY_PROMPT.format(text=text[:1000]))
+                for text in texts
+            ))
+            
+            return [
+                result.strip()[:500] or self._fallback_summary(text)
+                for text, result in zip(texts, results)
+            ]
+            
+        except Exception as e:
+            logger.error(f"Error generating batch summaries: {str(e)}")
+            return [self._fallback_summary(text) for text in texts]
+
     async def generate_recommendations(self, user_preferences: str, books_context: str) -> str:
         """Generate book recommendations based on user preferences"""
         if self.use_openrouter:
@@ -95,41 +174,56 @@ class LlamaService:
             return "Based on your preferences, I recommend exploring books in similar genres and by authors you've enjoyed before."
         
         try:
-            prompt = f"User preferences: {user_preferences}\nAvailable books: {books_context[:800]}\nRecommendation reasoning:"
-            
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(
-                None, 
-                self._generate_text, 
-                prompt
-            )
-            
-            if result and len(result) > 0:
-                generated = result[0]['generated_text']
-                reasoning = generated.split("Recommendation reasoning:")[-1].strip()
-                return reasoning[:300]
-            
-            return "Based on your reading history and preferences, these books match your interests."
+            prompt = RECOMMENDATION_PROMPT.format(preferences=user_preferences, books=books_context[:800])
+            reasoning = (await self._prompt_batcher.submit(prompt)).strip()
+            return reasoning[:300] or "Based on your reading history and preferences, these books match your interests."
             
         except Exception as e:
             logger.error(f"Error generating recommendations: {str(e)}")
             return "Based on your preferences, these books are recommended for you."
 
-    def _generate_text(self, prompt: str):
-        """Internal method to generate text (runs in executor)"""
-        return self.pipeline(
-            prompt,
-            max_length=len(prompt.split()) + 100,
-            num_return_sequences=1,
-            do_sample=True
-        )
+    async def _generate_prompt_batch(self, prompts: List[str]) -> List[str]:
+        """Batch handler for single-prompt calls (runs the model in a thread)"""
+        return await asyncio.to_thread(self._generate_text_batch, prompts)
+
+    def _encode_prompt(self, prompt: str) -> List[int]:
+        """Token IDs for a prompt, reusing the pre-tokenized summary prefix"""
+        if prompt.startswith(SUMMARY_PROMPT_PREFIX):
+            body = prompt[len(SUMMARY_PROMPT_PREFIX):]
+            return self._summary_prefix_ids + self.tokenizer.encode(body)
+        return self.tokenizer.encode(prompt)
+
+    def _generate_text_batch(self, prompts: List[str]) -> List[str]:
+        """
+        Generate continuations for a batch of prompts with one generate() call
+        (blocking, run in a thread). Returns only the newly generated text.
+        """
+        batch = self.tokenizer.pad(
+            {"input_ids": [self._encode_prompt(prompt) for prompt in prompts]},
+            return_tensors="pt"
+        ).to(self.model.device)
+        
+        with torch.inference_mode():
+            output = self.model.generate(
+                **batch,
+                max_new_tokens=MAX_NEW_TOKENS,
+                do_sample=True,
+                temperature=settings.LLAMA_TEMPERATURE,
+                pad_token_id=self.tokenizer.eos_token_id,
+                use_cache=True
+            )
+        
+        # Left padding keeps every prompt the same length, so new tokens start here
+        new_tokens = output[:, batch["input_ids"].shape[1]:]
+        return self.tokenizer.batch_decode(new_tokens, skip_special_tokens=True)
 
     def _fallback_summary(self, text: str) -> str:
         """Simple fallback summary when AI model is not available"""
-        sentences = text.split('.')[:3]  # Take first 3 sentences
-        summary = '. '.join(sentences).strip()
-        if summary and not summary.endswith('.'):
-            summary += '.'
+        # Scan lazily so only the first 3 sentences are ever materialized
+        sentences = (match.group().strip() for match in _SENTENCE_RE.finditer(text))
+        summary = " ".join(itertools.islice(filter(None, sentences), 3))
+        if summary and summary[-1] not in ".!?":
+            summary += "."
         return summary or "Summary not available."
 
     async def _generate_summary_openrouter(self, text: str) -> str:
@@ -137,32 +231,26 @@ class LlamaService:
         try:
             prompt = f"Please provide a concise 2-3 sentence summary of the following text:\n\n{text[:2000]}"
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    "https://openrouter.ai/api/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
-                        "Content-Type": "application/json",
-                    },
-                    json={
-                        "model": settings.OPENROUTER_MODEL,
-                        "messages": [
-                            {"role": "user", "content": prompt}
-                        ],
-                        "max_tokens": 150,
-                        "temperature": settings.LLAMA_TEMPERATURE,
-                    },
-                    timeout=30.0
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    if result.get("choices") and len(result["choices"]) > 0:
-                        summary = result["choices"][0]["message"]["content"].strip()
-                        return summary[:500]  # Limit summary length
-                
-                logger.warning(f"OpenRouter API error: {response.status_code}")
-                return self._fallback_summary(text)
+            response = await self._client().post(
+                OPENROUTER_URL,
+                json={
+                    "model": settings.OPENROUTER_MODEL,
+                    "messages": [
+                        {"role": "user", "content": prompt}
+                    ],
+                    "max_tokens": 150,
+                    "temperature": settings.LLAMA_TEMPERATURE,
+                }
+            )
+            
+            if response.status_code == 200:
+                result = response.json()
+                if result.get("choices") and len(result["choices"]) > 0:
+                    summary = result["choices"][0]["message"]["content"].strip()
+                    return summary[:500]  # Limit summary length
+            
+            logger.warning(f"OpenRouter API error: {response.status_code}")
+            return self._fallback_summary(text)
                 
         except Exception as e:
             logger.error(f"Error with OpenRouter API: {str(e)}")
@@ -180,32 +268,26 @@ Available Books:
 
 Please provide a brief, engaging explanation of why these books match the user's interests."""
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    "https://openrouter.ai/api/v1/chat/completions",
-                    headers={
-                        "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
-                        "Content-Type": "application/json",
-                    },
-                    json={
-                        "model": settings.OPENROUTER_MODEL,
-                        "messages": [
-                            {"role": "user", "content": prompt}
-                        ],
-                        "max_tokens": 200,
-                        "temperature": settings.LLAMA_TEMPERATURE,
-                    },
-                    timeout=30.0
-                )
-                
-                if response.status_code == 200:
-                    result = response.json()
-                    if result.get("choices") and len(result["choices"]) > 0:
-                        reasoning = result["choices"][0]["message"]["content"].strip()
-                        return reasoning[:300]
-                
-                logger.warning(f"OpenRouter API error: {response.status_code}")
-                return "Based on your preferences, these books are recommended for you."
+            response = await self._client().post(
+                OPENROUTER_URL,
+                json={
+                    "model": settings.OPENROUTER_MODEL,
+                    "messages": [
+                        {"role": "user", "content": prompt}
+                    ],
+                    "max_tokens": 200,
+                    "temperature": settings.LLAMA_TEMPERATURE,
+                }
+            )
+            
+            if response.status_code == 200:
+                result = response.json()
+                if result.get("choices") and len(result["choices"]) > 0:
+                    reasoning = result["choices"][0]["message"]["content"].strip()
+                    return reasoning[:300]
+            
+            logger.warning(f"OpenRouter API error: {response.status_code}")
+            return "Based on your preferences, these books are recommended for you."
                 
         except Exception as e:
             logger.error(f"Error with OpenRouter API: {str(e)}")
@@ -3,22 +3,85 @@ Recommendation service for book suggestions and AI-powered recommendations
 Uses ML-based genre matching and collaborative filtering
 With Redis caching for improved performance (AWS ElastiCache compatible)
 """
-import json
+import asyncio
 import hashlib
-from typing import List, Optional, Dict
+from datetime import datetime, timezone
+from typing import List, Optional, Dict, Tuple
+import orjson
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, desc, func
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-import numpy as np
+from sqlalchemy import and_, desc, exists, func, literal_column, or_, select
+from sqlalchemy.orm import aliased
 from loguru import logger
 
 from app.models.books import Book
 from app.models.users import User
 from app.models.reviews import Review
 from app.api.schemas import RecommendationResponse, BookResponse
-from app.services.llama_service import LlamaService
-from app.services.cache_service import cache_service
+from app.services.llama_service import LlamaService, llama_service
+from app.services.cache_service import CacheService, cache_service
+from app.services.cache_decorator import cached
+from app.services.batch_service import AsyncBatcher
+from app.services.similarity_index import book_document, similarity_index
+from app.models.base import AsyncSessionLocal
+from app.config.settings import settings
+
+
+def _book_to_dict(book: BookResponse) -> dict:
+    """Convert a book response to a dictionary for caching"""
+    data = book.model_dump()
+    data["created_at"] = _cache_timestamp(book.created_at)
+    data["updated_at"] = _cache_timestamp(book.updated_at)
+    return data
+
+
+def _dict_to_book(data: dict) -> BookResponse:
+    """Build the book response straight from cached data (no ORM instance)"""
+    data["created_at"] = _parse_timestamp(data.get("created_at"))
+    data["updated_at"] = _parse_timestamp(data.get("updated_at"))
+    return BookResponse.model_validate(data)
+
+
+def _to_responses(books: List[Book]) -> List[BookResponse]:
+    """Serialize query results once, so the cached payload is the response payload"""
+    return [BookResponse.model_validate(book) for book in books]
+
+
+def _cache_timestamp(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    Tag a (naive UTC) timestamp as UTC so MessagePack stores it as a compact
+    timestamp extension instead of a 26-character ISO string
+    """
+    return value.replace(tzinfo=timezone.utc) if value else None
+
+
+def _parse_timestamp(value) -> Optional[datetime]:
+    """Restore a timestamp stored by _book_to_dict to naive UTC"""
+    if isinstance(value, str):
+        # Entry written before timestamps were packed natively
+        return datetime.fromisoformat(value)
+    return value.replace(tzinfo=None) if value else None
+
+
+def _books_to_cache(books: List[BookResponse]) -> List[dict]:
+    """Serialize a list of books for caching"""
+    return [_book_to_dict(b) for b in books]
+
+
+def _books_from_cache(data: List[dict]) -> List[BookResponse]:
+    """Rebuild a list of books from cached data"""
+    return [_dict_to_book(b) for b in data]
+
+
+def _ranked_to_cache(ranked: Tuple[List[BookResponse], str]) -> list:
+    """Serialize ranked books and their prompt context for caching"""
+    books, books_context = ranked
+    return [_books_to_cache(books), books_context]
+
+
+def _ranked_from_cache(data: list) -> Tuple[List[BookResponse], str]:
+    """Rebuild ranked books and their prompt context from cached data"""
+    books, books_context = data
+    return _books_from_cache(books), books_context
 
 
 class RecommendationService:
@@ -30,35 +93,10 @@ class RecommendationService:
     4. Redis caching for improved performance (AWS ElastiCache compatible)
     """
     
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, llama: Optional[LlamaService] = None):
         self.db = db
-        self.llama_service = LlamaService()
-        self.vectorizer = TfidfVectorizer(stop_words='english')
-    
-    def _book_to_dict(self, book: Book) -> dict:
-        """Convert Book model to dictionary for caching"""
-        return {
-            "id": book.id,
-            "title": book.title,
-            "author": book.author,
-            "genre": book.genre,
-            "year_published": book.year_published,
-            "summary": book.summary,
-            "created_at": str(book.created_at) if book.created_at else None,
-            "updated_at": str(book.updated_at) if book.updated_at else None
-        }
-    
-    def _dict_to_book(self, data: dict) -> Book:
-        """Convert dictionary to Book model from cache"""
-        book = Book(
-            id=data.get("id"),
-            title=data.get("title"),
-            author=data.get("author"),
-            genre=data.get("genre"),
-            year_published=data.get("year_published"),
-            summary=data.get("summary")
-        )
-        return book
+        # Share the process-wide model and HTTP client instead of loading per request
+        self.llama_service = llama or llama_service
     
     async def get_recommendations_for_user(
         self, 
@@ -71,21 +109,15 @@ class RecommendationService:
         user_preferences = []
         if user.preferred_genres:
             try:
-                user_preferences = json.loads(user.preferred_genres)
-            except json.JSONDecodeError:
+                user_preferences = orjson.loads(user.preferred_genres)
+            except orjson.JSONDecodeError:
                 user_preferences = [g.strip() for g in user.preferred_genres.split(",")]
         
         # If genre is specified, use it; otherwise use user preferences
         target_genre = genre if genre else (user_preferences[0] if user_preferences else None)
         
-        # Get books with average ratings calculated from reviews
-        books_with_ratings = await self._get_books_with_ratings(target_genre, count)
-        
-        # Generate AI reasoning for recommendations
-        books_context = "\n".join([
-            f"- {book['book'].title} by {book['book'].author} ({book['book'].genre or 'General'}, Avg Rating: {book['avg_rating']:.1f}/5)"
-            for book in books_with_ratings
-        ])
+        # Top-rated books and their prompt lines (cached per genre and count)
+        books, books_context = await self._get_ranked_books(target_genre, count)
         
         user_context = f"User preferences: {', '.join(user_preferences) if user_preferences else 'No specific preferences'}"
         if target_genre:
@@ -96,48 +128,28 @@ class RecommendationService:
             books_context=books_context
         )
         
-        # Extract just the books for response
-        books = [item['book'] for item in books_with_ratings]
-        
         return RecommendationResponse(
-            books=[BookResponse.model_validate(book) for book in books],
+            books=books,
             reasoning=reasoning
         )
     
-    async def get_popular_books(self, limit: int = 10, genre: Optional[str] = None) -> List[Book]:
+    @cached(
+        key_template=CacheService.PREFIX_POPULAR + "{genre}:{limit}",
+        ttl=CacheService.TTL_POPULAR_BOOKS,
+        dump=_books_to_cache,
+        load=_books_from_cache
+    )
+    async def get_popular_books(self, limit: int = 10, genre: Optional[str] = None) -> List[BookResponse]:
         """Get popular books based on average ratings from reviews (with caching)"""
-        
-        # Try to get from cache first
-        cached = await cache_service.get_popular_books(genre, limit)
-        if cached:
-            logger.info(f"Cache HIT for popular books (genre={genre}, limit={limit})")
-            # Reconstruct Book objects from cached data
-            return [self._dict_to_book(b) for b in cached]
-        
-        # Calculate average rating for each book from reviews
-        subquery = select(
-            Review.book_id,
-            func.avg(Review.rating).label('avg_rating'),
-            func.count(Review.id).label('review_count')
-        ).group_by(Review.book_id).subquery()
-        
-        query = select(Book).join(
-            subquery, Book.id == subquery.c.book_id
-        )
+        # Ratings come from the books' review counters, no per-review aggregation
+        query = select(Book).where(Book.total_reviews > 0)
         
         if genre:
             query = query.where(Book.genre.ilike(f"%{genre}%"))
         
-        query = query.order_by(desc(subquery.c.avg_rating)).limit(limit)
+        query = query.order_by(desc(Book.average_rating)).limit(limit)
         result = await self.db.execute(query)
-        books = result.scalars().all()
-        
-        # Cache the result
-        books_data = [self._book_to_dict(b) for b in books]
-        await cache_service.set_popular_books(books_data, genre, limit)
-        logger.info(f"Cache SET for popular books (genre={genre}, limit={limit})")
-        
-        return books
+        return _to_responses(result.scalars().all())
     
     async def generate_content_summary(self, content: str) -> str:
         """Generate a summary for given content using Llama/OpenRouter (with caching)"""
@@ -145,54 +157,109 @@ class RecommendationService:
             return "No content provided to summarize."
         
         # Create a hash of the content for caching
-        content_hash = hashlib.md5(content.encode()).hexdigest()
-        
-        # Try to get from cache first
-        cached = await cache_service.get_ai_summary(content_hash)
-        if cached:
-            logger.info(f"Cache HIT for AI summary (hash={content_hash[:8]}...)")
-            return cached
+        content_hash = hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
         
-        # Generate summary using AI
-        summary = await self.llama_service.generate_summary(content)
-        
-        # Cache the result
-        await cache_service.set_ai_summary(content_hash, summary)
-        logger.info(f"Cache SET for AI summary (hash={content_hash[:8]}...)")
-        
-        return summary
+        # Cached, or generated once even if many requests miss at the same time
+        return await cache_service.get_or_set_summary(
+            content_hash, lambda: self.llama_service.generate_summary(content)
+        )
+    
+    async def generate_content_summary_batch(self, contents: List[str]) -> List[str]:
+        """
+        Generate summaries for several contents at once (with caching).
+        Cache misses are deduplicated and sent to the AI model in one batch.
+        """
+        summaries: List[Optional[str]] = [None] * len(contents)
+        positions: Dict[str, List[int]] = {}
+        
+        for i, content in enumerate(contents):
+            if not content or len(content.strip()) == 0:
+                summaries[i] = "No content provided to summarize."
+                continue
+            
+            content_hash = hashlib.blake2b(content.encode(), digest_size=16).hexdigest()
+            positions.setdefault(content_hash, []).append(i)
+        
+        # One MGET for all distinct contents
+        pending: Dict[str, List[int]] = {}
+        cached_summaries = await cache_service.mget_ai_summaries(list(positions))
+        for (content_hash, indexes), cached in zip(positions.items(), cached_summaries):
+            if cached:
+                logger.info(f"Cache HIT for AI summary (hash={content_hash[:8]}...)")
+                for i in indexes:
+                    summaries[i] = cached
+            else:
+                pending[content_hash] = indexes
+        
+        if pending:
+            # Only generate what no other worker is already generating
+            tokens = await asyncio.gather(*(cache_service.lock_ai_summary(h) for h in pending))
+            owned = {h: token for h, token in zip(pending, tokens) if token}
+            waiting = [h for h in pending if h not in owned]
+            
+            try:
+                if owned:
+                    # Generate all owned summaries with a single model call
+                    hashes = list(owned)
+                    generated = await self.llama_service.generate_summary_batch(
+                        [contents[pending[h][0]] for h in hashes]
+                    )
+                    for content_hash, summary in zip(hashes, generated):
+                        for i in pending[content_hash]:
+                            summaries[i] = summary
+                        await cache_service.set_ai_summary(content_hash, summary)
+                    logger.info(f"Cache SET for {len(hashes)} AI summaries (batch of {len(contents)})")
+            finally:
+                await asyncio.gather(*(cache_service.unlock_ai_summary(h, t) for h, t in owned.items()))
+            
+            if waiting:
+                results = dict(zip(waiting, await asyncio.gather(
+                    *(cache_service.wait_for_ai_summary(h) for h in waiting)
+                )))
+                # Whatever didn't show up in time is generated here after all
+                missing = [h for h in waiting if not results[h]]
+                if missing:
+                    generated = await self.llama_service.generate_summary_batch(
+                        [contents[pending[h][0]] for h in missing]
+                    )
+                    results.update(zip(missing, generated))
+                for content_hash in waiting:
+                    for i in pending[content_hash]:
+                        summaries[i] = results[content_hash]
+        
+        return summaries
+    
+    @cached(
+        key_template=CacheService.PREFIX_RECOMMENDATIONS + "ranked:{genre}:{count}",
+        ttl=CacheService.TTL_RECOMMENDATIONS,
+        dump=_ranked_to_cache,
+        load=_ranked_from_cache
+    )
+    async def _get_ranked_books(self, genre: Optional[str], count: int) -> Tuple[List[BookResponse], str]:
+        """Get the top-rated books and the context lines for the AI prompt"""
+        books_with_ratings = await self._get_books_with_ratings(genre, count)
+        books_context = "".join(
+            f"- {item['book'].title} by {item['book'].author} ({item['book'].genre or 'General'}, Avg Rating: {item['avg_rating']:.1f}/5)\n"
+            for item in books_with_ratings
+        ).rstrip("\n")
+        return _to_responses([item['book'] for item in books_with_ratings]), books_context
     
     async def _get_books_with_ratings(self, genre: Optional[str], count: int) -> List[Dict]:
-        """Get books with calculated average ratings from reviews"""
-        # Calculate average rating for each book
-        subquery = select(
-            Review.book_id,
-            func.avg(Review.rating).label('avg_rating'),
-            func.count(Review.id).label('review_count')
-        ).group_by(Review.book_id).subquery()
-        
-        query = select(
-            Book,
-            func.coalesce(subquery.c.avg_rating, 0.0).label('avg_rating'),
-            func.coalesce(subquery.c.review_count, 0).label('review_count')
-        ).outerjoin(
-            subquery, Book.id == subquery.c.book_id
-        )
+        """Get books with their average ratings (from the review counters)"""
+        avg_rating = func.coalesce(Book.average_rating, 0.0)
+        query = select(Book, avg_rating, Book.total_reviews)
         
         if genre:
             query = query.where(Book.genre.ilike(f"%{genre}%"))
         
         # Order by average rating and review count
-        query = query.order_by(
-            desc(func.coalesce(subquery.c.avg_rating, 0.0)),
-            desc(func.coalesce(subquery.c.review_count, 0))
-        ).limit(count * 2)
+        query = query.order_by(desc(avg_rating), desc(Book.total_reviews)).limit(count)
         
         result = await self.db.execute(query)
         rows = result.all()
         
         # Convert to list of dicts
-        books_with_ratings = [
+        return [
             {
                 'book': row[0],
                 'avg_rating': float(row[1]),
@@ -200,128 +267,119 @@ class RecommendationService:
             }
             for row in rows
         ]
-        
-        return books_with_ratings[:count]
     
-    async def get_similar_books(self, book_id: int, limit: int = 5) -> List[Book]:
+    async def warm_tfidf_index(self, force: bool = False):
+        """Build the shared TF-IDF index from all books (skipped if already fresh)"""
+        async with similarity_index.lock:
+            if not force and not similarity_index.is_stale:
+                return
+            
+            result = await self.db.execute(
+                select(Book.id, Book.genre, Book.author, Book.summary).order_by(Book.id)
+            )
+            documents = [
+                (row.id, book_document(row.genre, row.author, row.summary))
+                for row in result.all()
+            ]
+            
+            loop = asyncio.get_event_loop()
+            await loop.run_in_executor(None, similarity_index.build, documents)
+    
+    @cached(
+        key_template=CacheService.PREFIX_SIMILAR + "{book_id}:{limit}",
+        ttl=CacheService.TTL_SIMILAR_BOOKS,
+        dump=_books_to_cache,
+        load=_books_from_cache
+    )
+    async def get_similar_books(self, book_id: int, limit: int = 5) -> List[BookResponse]:
         """
         ML-based content similarity using TF-IDF (with caching)
         Finds books similar to the given book based on genre, author, and summary
         """
-        # Try to get from cache first
-        cached = await cache_service.get_similar_books(book_id, limit)
-        if cached:
-            logger.info(f"Cache HIT for similar books (book_id={book_id}, limit={limit})")
-            return [self._dict_to_book(b) for b in cached]
-        
-        # Get all books
-        result = await self.db.execute(select(Book))
-        all_books = result.scalars().all()
-        
-        if not all_books:
+        if similarity_index.is_stale:
+            await self.warm_tfidf_index()
+        
+        similar_ids = similarity_index.most_similar(book_id, limit)
+        
+        if similar_ids is None:
+            # No usable TF-IDF vectors: fall back to books in the same genre
+            # (books without a genre match each other), joining the target in
+            # the same query so an unknown book_id returns nothing
+            target = aliased(Book)
+            result = await self.db.execute(
+                select(Book)
+                .join(target, target.id == book_id)
+                .where(
+                    Book.id != book_id,
+                    or_(Book.genre == target.genre, and_(Book.genre.is_(None), target.genre.is_(None))),
+                )
+                .limit(limit)
+            )
+            return _to_responses(result.scalars().all())
+        
+        if not similar_ids:
             return []
         
-        # Find the target book
-        target_book = None
-        for book in all_books:
-            if book.id == book_id:
-                target_book = book
-                break
-        
-        if not target_book:
-            return []
+        result = await self.db.execute(select(Book).where(Book.id.in_(similar_ids)))
+        books_by_id = {book.id: book for book in result.scalars().all()}
+        similar_books = [books_by_id[i] for i in similar_ids if i in books_by_id]
         
-        # Create content strings for TF-IDF
-        def create_content(book: Book) -> str:
-            parts = []
-            if book.genre:
-                parts.append(book.genre)
-            if book.author:
-                parts.append(book.author)
-            if book.summary:
-                parts.append(book.summary)
-            return " ".join(parts)
-        
-        contents = [create_content(book) for book in all_books]
-        
-        # Handle case where all contents are empty
-        if all(not c.strip() for c in contents):
-            # Fallback: return books in same genre
-            similar_books = [b for b in all_books if b.id != book_id and b.genre == target_book.genre][:limit]
-        else:
-            # Create TF-IDF matrix
-            try:
-                tfidf_matrix = self.vectorizer.fit_transform(contents)
-                
-                # Find index of target book
-                target_idx = all_books.index(target_book)
-                
-                # Calculate cosine similarity
-                similarities = cosine_similarity(tfidf_matrix[target_idx:target_idx+1], tfidf_matrix)[0]
-                
-                # Get indices of most similar books (excluding the book itself)
-                similar_indices = np.argsort(similarities)[::-1]
-                
-                similar_books = []
-                for idx in similar_indices:
-                    if all_books[idx].id != book_id and len(similar_books) < limit:
-                        similar_books.append(all_books[idx])
-            except Exception:
-                # Fallback: return books in same genre
-                similar_books = [b for b in all_books if b.id != book_id and b.genre == target_book.genre][:limit]
-        
-        # Cache the result
-        books_data = [self._book_to_dict(b) for b in similar_books]
-        await cache_service.set_similar_books(book_id, books_data, limit)
-        logger.info(f"Cache SET for similar books (book_id={book_id}, limit={limit})")
-        
-        return similar_books
+        return _to_responses(similar_books)
     
-    async def get_books_by_user_history(self, user_id: int, limit: int = 5) -> List[Book]:
+    @cached(
+        key_template=CacheService.PREFIX_RECOMMENDATIONS + "history:{user_id}:{limit}",
+        ttl=CacheService.TTL_RECOMMENDATIONS,
+        dump=_books_to_cache,
+        load=_books_from_cache
+    )
+    async def get_books_by_user_history(self, user_id: int, limit: int = 5) -> List[BookResponse]:
         """
-        Collaborative filtering: Get recommendations based on user's review history
+        Collaborative filtering: Get recommendations based on user's review history (with caching)
         """
-        # Get genres of books the user has reviewed positively (rating >= 4)
-        user_reviews_query = select(Review).where(
-            Review.user_id == user_id,
-            Review.rating >= 4.0
+        # Positive reviews (rating >= 4) by this user, correlated per book.
+        # The threshold is inlined, not bound, so Postgres can match it to the
+        # ix_reviews_positive_user partial index even with generic plans.
+        positive = Review.rating >= literal_column("4")
+        liked = and_(Review.book_id == Book.id, Review.user_id == user_id, positive)
+        
+        # Genres of the books the user liked, without loading reviews or books
+        genres_query = (
+            select(Book.genre).distinct().join(Review, liked).where(Book.genre.is_not(None))
         )
-        user_reviews_result = await self.db.execute(user_reviews_query)
-        user_reviews = user_reviews_result.scalars().all()
-        
-        if not user_reviews:
-            # No positive reviews, return popular books
-            return await self.get_popular_books(limit=limit)
-        
-        # Get the book IDs user has already reviewed
-        reviewed_book_ids = [r.book_id for r in user_reviews]
-        
-        # Get genres from positively reviewed books
-        reviewed_books_query = select(Book).where(Book.id.in_(reviewed_book_ids))
-        reviewed_books_result = await self.db.execute(reviewed_books_query)
-        reviewed_books = reviewed_books_result.scalars().all()
-        
-        # Get unique genres
-        genres = list(set(b.genre for b in reviewed_books if b.genre))
+        genres = (await self.db.scalars(genres_query)).all()
         
         if not genres:
+            # No positive reviews (or none with a genre), return popular books
             return await self.get_popular_books(limit=limit)
         
-        # Find books in similar genres that the user hasn't reviewed
-        # Also calculate average rating from reviews
-        subquery = select(
-            Review.book_id,
-            func.avg(Review.rating).label('avg_rating')
-        ).group_by(Review.book_id).subquery()
-        
-        query = select(Book).outerjoin(
-            subquery, Book.id == subquery.c.book_id
-        ).where(
-            ~Book.id.in_(reviewed_book_ids),  # User hasn't reviewed this book
+        # Find the best-rated books in similar genres that the user hasn't reviewed
+        query = select(Book).where(
+            ~exists().where(liked),  # User hasn't reviewed this book
             Book.genre.in_(genres)  # Similar genre
         ).order_by(
-            desc(func.coalesce(subquery.c.avg_rating, 0.0))
+            desc(func.coalesce(Book.average_rating, 0.0))
         ).limit(limit)
         
         result = await self.db.execute(query)
-        return result.scalars().all()
+        return _to_responses(result.scalars().all())
+
+
+# Global batcher for /generate-summary requests.
+# The batch path never touches the database, so the service needs no session.
+summary_batcher = AsyncBatcher(
+    RecommendationService(db=None).generate_content_summary_batch,
+    batch_size=settings.SUMMARY_BATCH_SIZE,
+    max_wait_ms=settings.SUMMARY_BATCH_MAX_WAIT_MS,
+    max_concurrency=settings.SUMMARY_BATCH_CONCURRENCY
+)
+
+
+async def refresh_tfidf_index_periodically(interval: int):
+    """Rebuild the TF-IDF index every `interval` seconds (background task)"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with AsyncSessionLocal() as session:
+                await RecommendationService(session).warm_tfidf_index(force=True)
+        except Exception as e:
+            logger.error(f"Failed to refresh TF-IDF index: {str(e)}")
@@ -1,20 +1,30 @@
 """
 Review service for business logic
 """
-from typing import List, Optional
+import hashlib
+from typing import AsyncIterator, List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, insert, delete
 
-from app.models.reviews import Review
+from app.models.reviews import Review, ADJUST_BOOK_RATING, book_rating_deltas
 from app.models.books import Book
-from app.api.schemas import ReviewCreate, ReviewUpdate
-from app.services.llama_service import LlamaService
+from app.api.schemas import ReviewCreate, ReviewCreateForBook, ReviewUpdate
+from app.services.llama_service import LlamaService, llama_service
+from app.services.cache_service import cache_service
+
+
+# Rows fetched per round trip when streaming large listings
+STREAM_BATCH_SIZE = 100
+
+# Written reviews included in an AI review summary prompt
+REVIEW_SUMMARY_LIMIT = 10
 
 
 class ReviewService:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, llama: Optional[LlamaService] = None):
         self.db = db
-        self.llama_service = LlamaService()
+        # Share the process-wide model and HTTP client instead of loading per request
+        self.llama_service = llama or llama_service
 
     async def create_review(self, review_data: ReviewCreate) -> Review:
         """Create a new review"""
@@ -22,9 +32,12 @@ class ReviewService:
         self.db.add(review)
         await self.db.commit()
         await self.db.refresh(review)
+        
+        # Ratings changed, so cached rankings are stale
+        await cache_service.invalidate_book_caches(review.book_id)
         return review
 
-    async def create_review_for_book(self, book_id: int, review_data: dict) -> Optional[Review]:
+    async def create_review_for_book(self, book_id: int, review_data: ReviewCreateForBook) -> Optional[Review]:
         """Create a review for a specific book"""
         # First verify book exists
         book_query = select(Book).where(Book.id == book_id)
@@ -34,18 +47,35 @@ class ReviewService:
         if not book:
             return None
         
-        review = Review(
-            book_id=book_id,
-            user_id=review_data.get('user_id', 1),  # Default user for demo
-            rating=review_data['rating'],
-            review_text=review_data.get('review_text')
-        )
+        review = Review(book_id=book_id, **review_data.model_dump())
         
         self.db.add(review)
         await self.db.commit()
         await self.db.refresh(review)
+        
+        await cache_service.invalidate_book_caches(book_id)
         return review
 
+    async def bulk_create_reviews(self, reviews_data: List[ReviewCreate]) -> List[Review]:
+        """
+        Create many reviews with a single multi-row INSERT ... RETURNING
+        instead of one flush per review
+        """
+        result = await self.db.scalars(
+            insert(Review).returning(Review, sort_by_parameter_order=True),
+            [review_data.model_dump() for review_data in reviews_data]
+        )
+        reviews = result.all()
+        
+        # Bulk inserts skip the per-object mapper events, so update the
+        # book counters here: one executemany, one row per book
+        deltas = book_rating_deltas((review.book_id, review.rating) for review in reviews)
+        await self.db.execute(ADJUST_BOOK_RATING, deltas)
+        await self.db.commit()
+        
+        await cache_service.invalidate_book_caches(*(delta["b_id"] for delta in deltas))
+        return reviews
+
     async def get_reviews(
         self, 
         skip: int = 0, 
@@ -54,6 +84,31 @@ class ReviewService:
         user_id: Optional[int] = None
     ) -> List[Review]:
         """Get reviews with optional filtering"""
+        query = self._reviews_query(skip, limit, book_id, user_id)
+        result = await self.db.execute(query)
+        return result.scalars().all()
+
+    async def stream_reviews(
+        self, 
+        skip: int = 0, 
+        limit: int = 100,
+        book_id: Optional[int] = None,
+        user_id: Optional[int] = None
+    ) -> AsyncIterator[Review]:
+        """Stream reviews with optional filtering from a server-side cursor"""
+        query = self._reviews_query(skip, limit, book_id, user_id)
+        result = await self.db.stream_scalars(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+        async for review in result:
+            yield review
+
+    def _reviews_query(
+        self,
+        skip: int,
+        limit: int,
+        book_id: Optional[int],
+        user_id: Optional[int]
+    ):
+        """Build the filtered review listing query"""
         query = select(Review)
         
         if book_id:
@@ -62,9 +117,7 @@ class ReviewService:
         if user_id:
             query = query.where(Review.user_id == user_id)
         
-        query = query.offset(skip).limit(limit)
-        result = await self.db.execute(query)
-        return result.scalars().all()
+        return query.offset(skip).limit(limit)
 
     async def get_reviews_for_book(self, book_id: int, skip: int = 0, limit: int = 100) -> List[Review]:
         """Get all reviews for a specific book"""
@@ -87,37 +140,56 @@ class ReviewService:
         
         await self.db.commit()
         await self.db.refresh(review)
+        
+        await cache_service.invalidate_book_caches(review.book_id)
         return review
 
     async def delete_review(self, review_id: int) -> bool:
-        """Delete a review"""
-        review = await self.get_review_by_id(review_id)
-        if not review:
+        """Delete a review with a single DELETE ... RETURNING (no SELECT first)"""
+        result = await self.db.execute(
+            delete(Review).where(Review.id == review_id).returning(Review.book_id, Review.rating)
+        )
+        deleted = result.first()
+        if not deleted:
             return False
         
-        await self.db.delete(review)
+        # Statement deletes skip the mapper events, so update the counters here
+        await self.db.execute(ADJUST_BOOK_RATING, book_rating_deltas([deleted], sign=-1)[0])
         await self.db.commit()
+        
+        await cache_service.invalidate_book_caches(deleted.book_id)
         return True
 
     async def generate_review_summary(self, book_id: int) -> str:
         """Generate AI summary of reviews for a book"""
-        reviews = await self.get_reviews(book_id=book_id, limit=1000)
-        
-        if not reviews:
-            return "No reviews available for this book."
-        
-        # Create prompt with review contents
-        review_texts = []
-        for review in reviews:
-            if review.review_text:
-                review_texts.append(f"Rating: {review.rating}/5 - {review.review_text}")
+        # Only the written reviews that go into the prompt leave the database
+        query = (
+            select(Review.rating, Review.review_text)
+            .where(Review.book_id == book_id, Review.review_text.is_not(None), Review.review_text != "")
+            .limit(REVIEW_SUMMARY_LIMIT)
+        )
+        rows = (await self.db.execute(query)).all()
         
-        if not review_texts:
-            return f"This book has {len(reviews)} ratings with an average of {sum(r.rating for r in reviews)/len(reviews):.1f}/5 stars, but no written reviews."
+        if not rows:
+            # Rarely needed, so the book's review counters are read only here
+            stats = await self.db.execute(
+                select(Book.total_reviews, Book.average_rating).where(Book.id == book_id)
+            )
+            total_reviews, average_rating = stats.one_or_none() or (0, None)
+            
+            if not total_reviews:
+                return "No reviews available for this book."
+            return f"This book has {total_reviews} ratings with an average of {average_rating:.1f}/5 stars, but no written reviews."
         
-        prompt = f"Summarize these book reviews:\n" + "\n".join(review_texts[:10])  # Limit to first 10 reviews
+        review_texts = [f"Rating: {rating}/5 - {review_text}" for rating, review_text in rows]
+        prompt = f"Summarize these book reviews:\n" + "\n".join(review_texts)
         
-        return await self.llama_service.generate_summary(prompt)
+        # Keyed on the prompt itself, so adding, editing or deleting one of
+        # these reviews yields a new key and the stale summary is never served
+        prompt_hash = hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest()
+        return await cache_service.get_or_set_summary(
+            prompt_hash, lambda: self.llama_service.generate_summary(prompt)
+        )
 
     async def get_review_summary_for_book(self, book_id: int) -> str:
         """Get review summary for a book"""
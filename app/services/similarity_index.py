@@ -0,0 +1,118 @@
+"""
+In-memory TF-IDF index for content-based book similarity
+
+The index is built once (at startup, after book updates/deletes, and
+periodically) instead of refitting the vectorizer on every
+/recommendations/similar call. Terms are hashed into a fixed feature space,
+so there is no vocabulary to hold or refit: new books are appended as one
+extra row. Queries only compute the similarity of one row against the
+stored matrix.
+"""
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from loguru import logger
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+
+# Stateless term hashing (raw counts; TF-IDF weighting and L2 norm come after)
+_hasher = HashingVectorizer(
+    n_features=2 ** 18, alternate_sign=False, norm=None, stop_words='english'
+)
+
+
+def book_document(genre: Optional[str], author: Optional[str], summary: Optional[str]) -> str:
+    """Content string indexed for a book: genre, author and summary"""
+    return " ".join(part for part in (genre, author, summary) if part)
+
+
+class SimilarityIndex:
+    """TF-IDF vectors for all books, keyed by book ID"""
+
+    def __init__(self):
+        self.transformer: Optional[TfidfTransformer] = None
+        self.matrix = None
+        self.book_ids: List[int] = []
+        self._positions: Dict[int, int] = {}
+        self._stale = True
+        self.lock = asyncio.Lock()
+
+    @property
+    def is_stale(self) -> bool:
+        return self._stale
+
+    def invalidate(self):
+        """Mark the index for rebuilding (call after book writes)"""
+        self._stale = True
+
+    def build(self, documents: List[Tuple[int, str]]):
+        """Fit IDF weights on (book_id, content) pairs (CPU-bound, run in executor)"""
+        book_ids = [book_id for book_id, _ in documents]
+
+        # norm='l2' (the default) is relied on by most_similar's dot product
+        transformer = TfidfTransformer(norm='l2')
+        matrix = None
+        # The hasher can't transform an empty batch (no books yet)
+        if documents:
+            # Books often share a content string (same genre and author, no
+            # summary): tokenize each distinct string once, then expand the
+            # rows back so IDF still counts every book
+            unique: Dict[str, int] = {}
+            rows = [unique.setdefault(content, len(unique)) for _, content in documents]
+            counts = _hasher.transform(list(unique))[rows]
+            if counts.nnz:
+                matrix = transformer.fit_transform(counts).tocsr()
+            # else: every document was empty after stop-word removal
+
+        self.transformer = transformer
+        self.matrix = matrix
+        self.book_ids = book_ids
+        self._positions = {book_id: i for i, book_id in enumerate(book_ids)}
+        self._stale = False
+        logger.info(f"TF-IDF index built for {len(book_ids)} books")
+
+    def add(self, book_id: int, content: str):
+        """
+        Append a new book without refitting (it is weighted with the current
+        IDF until the next rebuild). Falls back to invalidate() when the index
+        is stale, empty or being rebuilt.
+        """
+        if self._stale or self.matrix is None or self.lock.locked() or book_id in self._positions:
+            self.invalidate()
+            return
+
+        row = self.transformer.transform(_hasher.transform([content]))
+        self.matrix = sp.vstack([self.matrix, row], format="csr")
+        self._positions[book_id] = len(self.book_ids)
+        self.book_ids.append(book_id)
+
+    def most_similar(self, book_id: int, limit: int) -> Optional[List[int]]:
+        """
+        Get IDs of the books most similar to the given one, best first.
+        Returns None when there are no usable TF-IDF vectors, and an empty
+        list when the book is not in the index.
+        """
+        if self.matrix is None:
+            return None
+
+        position = self._positions.get(book_id)
+        if position is None:
+            return []
+
+        # TF-IDF rows are L2-normalized, so a sparse dot product is the cosine
+        similarities = (self.matrix @ self.matrix[position].T).toarray().ravel()
+        similarities[position] = -np.inf  # Exclude the book itself
+
+        k = min(limit, len(self.book_ids) - 1)
+        if k <= 0:
+            return []
+
+        # Partial selection of the top k, then sort only those
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        return [self.book_ids[i] for i in top]
+
+
+# Global index instance
+similarity_index = SimilarityIndex()
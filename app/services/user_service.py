@@ -1,12 +1,57 @@
 """
 User service for business logic
 """
-from typing import List, Optional
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, List, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, or_, delete
 
 from app.models.users import User
+from app.models.reviews import Review, ADJUST_BOOK_RATING, book_rating_deltas
 from app.api.schemas import UserCreate, UserUpdate
+from app.services.cache_service import cache_service
+
+
+# Rows fetched per round trip when streaming large listings
+STREAM_BATCH_SIZE = 100
+
+# Short-lived cache of successful password checks so repeat logins skip bcrypt.
+# Keys include the stored hash, so a password change invalidates them.
+PASSWORD_CACHE_MAXSIZE = 1024
+PASSWORD_CACHE_TTL = 60  # seconds
+_password_cache_salt = os.urandom(16)
+_password_cache: "OrderedDict[bytes, float]" = OrderedDict()
+
+
+def _password_key(user: User, password: str) -> bytes:
+    digest = hashlib.blake2b(password.encode(), key=_password_cache_salt, digest_size=16)
+    digest.update(user.username.encode())
+    digest.update(user.hashed_password.encode())
+    return digest.digest()
+
+
+async def verify_password(user: User, password: str) -> bool:
+    """Check a password, running bcrypt in a worker thread on cache misses"""
+    key = _password_key(user, password)
+    now = time.monotonic()
+    
+    expires_at = _password_cache.get(key)
+    if expires_at is not None:
+        if expires_at > now:
+            return True
+        del _password_cache[key]
+    
+    if not await asyncio.to_thread(user.verify_password, password):
+        return False
+    
+    _password_cache[key] = now + PASSWORD_CACHE_TTL
+    if len(_password_cache) > PASSWORD_CACHE_MAXSIZE:
+        _password_cache.popitem(last=False)
+    return True
 
 
 class UserService:
@@ -22,7 +67,8 @@ class UserService:
             bio=user_data.bio,
             preferred_genres=user_data.preferred_genres
         )
-        user.set_password(user_data.password)
+        # bcrypt is deliberately slow; keep it off the event loop
+        user.hashed_password = await asyncio.to_thread(User.get_password_hash, user_data.password)
         
         self.db.add(user)
         await self.db.commit()
@@ -35,6 +81,13 @@ class UserService:
         result = await self.db.execute(query)
         return result.scalars().all()
 
+    async def stream_users(self, skip: int = 0, limit: int = 100) -> AsyncIterator[User]:
+        """Stream users with pagination from a server-side cursor"""
+        query = select(User).offset(skip).limit(limit)
+        result = await self.db.stream_scalars(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+        async for user in result:
+            yield user
+
     async def get_user_by_id(self, user_id: int) -> Optional[User]:
         """Get a user by ID"""
         query = select(User).where(User.id == user_id)
@@ -53,6 +106,12 @@ class UserService:
         result = await self.db.execute(query)
         return result.scalar_one_or_none()
 
+    async def get_users_by_email_or_username(self, email: str, username: str) -> List[User]:
+        """Get users matching either the email or the username (single query)"""
+        query = select(User).where(or_(User.email == email, User.username == username))
+        result = await self.db.execute(query)
+        return result.scalars().all()
+
     async def update_user(self, user_id: int, user_data: UserUpdate) -> Optional[User]:
         """Update a user"""
         user = await self.get_user_by_id(user_id)
@@ -67,18 +126,33 @@ class UserService:
         return user
 
     async def delete_user(self, user_id: int) -> bool:
-        """Delete a user"""
-        user = await self.get_user_by_id(user_id)
-        if not user:
+        """
+        Delete a user and their reviews with DELETE statements instead of
+        loading the user and each review into the session
+        """
+        # Statement deletes skip the review mapper events, so take the deleted
+        # ratings off the book counters here: one executemany, one row per book
+        result = await self.db.execute(
+            delete(Review).where(Review.user_id == user_id).returning(Review.book_id, Review.rating)
+        )
+        deltas = book_rating_deltas(result.all(), sign=-1)
+        if deltas:
+            await self.db.execute(ADJUST_BOOK_RATING, deltas)
+        
+        result = await self.db.execute(delete(User).where(User.id == user_id))
+        if not result.rowcount:
+            await self.db.rollback()
             return False
         
-        await self.db.delete(user)
         await self.db.commit()
+        
+        if deltas:
+            await cache_service.invalidate_book_caches(*(delta["b_id"] for delta in deltas))
         return True
 
     async def authenticate_user(self, username: str, password: str) -> Optional[User]:
         """Authenticate a user by username and password"""
         user = await self.get_user_by_username(username)
-        if user and user.verify_password(password):
+        if user and await verify_password(user, password):
             return user
         return None
@@ -1,6 +1,7 @@
 """
 Alembic environment configuration for async database operations
 """
+import re
 from logging.config import fileConfig
 from sqlalchemy import engine_from_config, create_engine
 from sqlalchemy import pool
@@ -16,6 +17,9 @@ from app.models.books import Book
 from app.models.users import User
 from app.models.reviews import Review
 
+# channel_binding query parameter (not supported by psycopg2)
+_CHANNEL_BINDING_RE = re.compile(r'[&?]channel_binding=[^&]*')
+
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
@@ -79,11 +83,8 @@ def run_migrations_online() -> None:
     # Use sync connection for Alembic (simpler and more reliable)
     database_url = settings.DATABASE_URL
     
-    # Remove channel_binding parameter if present (not supported by psycopg2)
-    if "channel_binding" in database_url:
-        # Remove channel_binding parameter from URL
-        import re
-        database_url = re.sub(r'[&?]channel_binding=[^&]*', '', database_url)
+    # Remove channel_binding parameter if present
+    database_url = _CHANNEL_BINDING_RE.sub('', database_url)
     
     connectable = create_engine(
         database_url,
@@ -0,0 +1,48 @@
+"""Add trigram indexes for book search
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2024-01-02 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEARCH_COLUMNS = ('title', 'author', 'summary')
+
+
+def upgrade() -> None:
+    """
+    Create pg_trgm GIN indexes on the columns searched with ILIKE '%term%'.
+    Only applies to PostgreSQL.
+    """
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for column in SEARCH_COLUMNS:
+        op.create_index(
+            f'ix_books_{column}_trgm',
+            'books',
+            [column],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={column: 'gin_trgm_ops'}
+        )
+
+
+def downgrade() -> None:
+    """Drop the trigram indexes (the extension is left installed)"""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    
+    for column in SEARCH_COLUMNS:
+        op.drop_index(f'ix_books_{column}_trgm', table_name='books')
@@ -0,0 +1,37 @@
+"""Add server-side defaults for created_at / updated_at
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2024-01-03 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+from app.models.base import utcnow
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('users', 'books', 'reviews')
+
+
+def upgrade() -> None:
+    """Let the database fill in timestamps for rows inserted outside the ORM"""
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('created_at', server_default=utcnow())
+            batch_op.alter_column('updated_at', server_default=utcnow())
+
+
+def downgrade() -> None:
+    """Drop the timestamp server defaults"""
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('created_at', server_default=None)
+            batch_op.alter_column('updated_at', server_default=None)
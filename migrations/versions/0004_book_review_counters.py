@@ -0,0 +1,40 @@
+"""Add review counters to books
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2024-01-04 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Add total_reviews / rating_sum and backfill them from existing reviews"""
+    with op.batch_alter_table('books') as batch_op:
+        batch_op.add_column(sa.Column('total_reviews', sa.Integer(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('rating_sum', sa.Float(), nullable=False, server_default='0'))
+
+    op.execute(
+        """
+        UPDATE books SET
+            total_reviews = (SELECT COUNT(*) FROM reviews WHERE reviews.book_id = books.id),
+            rating_sum = (SELECT COALESCE(SUM(rating), 0) FROM reviews WHERE reviews.book_id = books.id)
+        """
+    )
+
+
+def downgrade() -> None:
+    """Drop the review counters"""
+    with op.batch_alter_table('books') as batch_op:
+        batch_op.drop_column('rating_sum')
+        batch_op.drop_column('total_reviews')
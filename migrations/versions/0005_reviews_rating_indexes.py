@@ -0,0 +1,33 @@
+"""Replace the reviews book_id / user_id indexes with rating-covering ones
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2024-01-05 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Index rating alongside book_id / user_id; the old indexes are their prefixes"""
+    op.create_index('ix_reviews_book_rating', 'reviews', ['book_id'], postgresql_include=['rating'])
+    op.create_index('ix_reviews_user_rating', 'reviews', ['user_id', 'rating'])
+    op.drop_index('ix_reviews_book_id', table_name='reviews')
+    op.drop_index('ix_reviews_user_id', table_name='reviews')
+
+
+def downgrade() -> None:
+    """Restore the single-column indexes"""
+    op.create_index('ix_reviews_book_id', 'reviews', ['book_id'], unique=False)
+    op.create_index('ix_reviews_user_id', 'reviews', ['user_id'], unique=False)
+    op.drop_index('ix_reviews_user_rating', table_name='reviews')
+    op.drop_index('ix_reviews_book_rating', table_name='reviews')
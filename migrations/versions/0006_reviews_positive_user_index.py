@@ -0,0 +1,31 @@
+"""Add a partial index on positive reviews for user-history recommendations
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2024-01-06 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Index (user_id, book_id) of reviews rated 4 or higher"""
+    op.create_index(
+        'ix_reviews_positive_user', 'reviews', ['user_id', 'book_id'],
+        postgresql_where=sa.text('rating >= 4')
+    )
+
+
+def downgrade() -> None:
+    """Drop the partial index"""
+    op.drop_index('ix_reviews_positive_user', table_name='reviews')
@@ -0,0 +1,43 @@
+"""Add a pg_trgm GIN index on books.genre
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2024-01-07 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """
+    Index genre for the ILIKE '%genre%' filters (popular books, recommendations,
+    book listing). Only applies to PostgreSQL; pg_trgm is installed by 0002.
+    """
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    
+    op.create_index(
+        'ix_books_genre_trgm',
+        'books',
+        ['genre'],
+        unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'genre': 'gin_trgm_ops'}
+    )
+
+
+def downgrade() -> None:
+    """Drop the genre trigram index"""
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    
+    op.drop_index('ix_books_genre_trgm', table_name='books')
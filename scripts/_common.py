@@ -0,0 +1,43 @@
+"""
+Setup shared by the sync maintenance scripts (seed_data.py, fix_passwords.py):
+.env loading, DATABASE_URL cleanup and engine creation
+"""
+import os
+import re
+
+import bcrypt
+from dotenv import load_dotenv
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+# Load environment variables (once, whichever script imports this first)
+load_dotenv()
+
+DEFAULT_DATABASE_URL = "postgresql://localhost/book_management"
+
+# Password for every seeded account, hashed at bcrypt's minimum cost unless
+# BCRYPT_ROUNDS (the app's work factor setting) asks for more
+SEED_PASSWORD = "password123"
+SEED_BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "4"))
+
+# channel_binding query parameter (not supported by psycopg2)
+CHANNEL_BINDING_PARAM = re.compile(r'[&?]channel_binding=[^&]*')
+
+
+def clean_database_url(url: str) -> str:
+    """Remove URL parameters psycopg2 doesn't accept"""
+    if "channel_binding" in url:
+        url = CHANNEL_BINDING_PARAM.sub('', url)
+    return url
+
+
+def get_engine(**kwargs) -> Engine:
+    """Sync engine for DATABASE_URL (kwargs go to create_engine)"""
+    database_url = clean_database_url(os.getenv("DATABASE_URL", DEFAULT_DATABASE_URL))
+    return create_engine(database_url, **kwargs)
+
+
+def seed_password_hash() -> str:
+    """bcrypt hash of SEED_PASSWORD (computed once, shared by all seeded users)"""
+    salt = bcrypt.gensalt(rounds=SEED_BCRYPT_ROUNDS)
+    return bcrypt.hashpw(SEED_PASSWORD.encode('utf-8'), salt).decode('utf-8')
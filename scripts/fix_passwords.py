@@ -5,60 +5,57 @@ Run: python scripts/fix_passwords.py
 """
 import sys
 import os
-import re
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlalchemy import create_engine, text
-from sqlalchemy.orm import sessionmaker
-import bcrypt
-from dotenv import load_dotenv
+from sqlalchemy import text
+from sqlalchemy.pool import NullPool
 
-load_dotenv()
-
-# Get database URL
-database_url = os.getenv("DATABASE_URL", "postgresql://localhost/book_management")
-if "channel_binding" in database_url:
-    database_url = re.sub(r'[&?]channel_binding=[^&]*', '', database_url)
+from _common import SEED_BCRYPT_ROUNDS, SEED_PASSWORD, get_engine
 
 print("🔐 Fixing user passwords...")
 
-engine = create_engine(database_url)
-Session = sessionmaker(bind=engine)
-session = Session()
+# One-shot script: a single connection, no pool to keep around
+engine = get_engine(poolclass=NullPool)
 
 try:
-    # Generate proper bcrypt hash for "password123"
-    password = "password123"
-    salt = bcrypt.gensalt()
-    password_hash = bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
-    print(f"✅ Generated new bcrypt hash: {password_hash[:20]}...")
+    password = SEED_PASSWORD
+    rounds = SEED_BCRYPT_ROUNDS
     
-    # Update all users with the new hash
-    result = session.execute(
-        text("UPDATE users SET hashed_password = :hash"),
-        {"hash": password_hash}
-    )
+    # One transaction on one connection; it commits when the block exits
+    with engine.begin() as conn:
+        # Hash in Postgres with pgcrypto (bcrypt "bf" salts, which the app's
+        # bcrypt.checkpw accepts). The CTE hashes and verifies once for all
+        # users, and the UPDATE returns that check in the same round trip.
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pgcrypto"))
+        rows = conn.execute(
+            text("""
+                WITH new_hash AS (
+                    SELECT value, crypt(:password, value) = value AS verified
+                    FROM (SELECT crypt(:password, gen_salt('bf', :rounds)) AS value) AS generated
+                )
+                UPDATE users SET hashed_password = new_hash.value
+                FROM new_hash
+                RETURNING users.username, new_hash.verified
+            """),
+            {"password": password, "rounds": rounds}
+        ).fetchall()
     
-    session.commit()
-    print(f"✅ Updated {result.rowcount} users with new password hash")
+    print(f"✅ Updated {len(rows)} users with new password hash")
     
     # Verify
-    test_result = session.execute(text("SELECT username, hashed_password FROM users LIMIT 1"))
-    row = test_result.fetchone()
-    if row:
-        print(f"\n🧪 Testing password for user: {row[0]}")
-        is_valid = bcrypt.checkpw(password.encode('utf-8'), row[1].encode('utf-8'))
+    if rows:
+        username, is_valid = rows[0]
+        print(f"\n🧪 Testing password for user: {username}")
         print(f"   Password verification: {'✅ SUCCESS' if is_valid else '❌ FAILED'}")
     
     print("\n🎉 Passwords fixed! Login should work now.")
     print("   Username: shefaliverma")
-    print("   Password: password123")
+    print(f"   Password: {SEED_PASSWORD}")
 
 except Exception as e:
-    session.rollback()
     print(f"❌ Error: {e}")
     import traceback
     traceback.print_exc()
 finally:
-    session.close()
+    engine.dispose()
@@ -11,27 +11,54 @@ Author: Shefali Verma
 import asyncio
 import sys
 import os
+from typing import List
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlalchemy import text
+import bcrypt
+from sqlalchemy import insert, inspect, text
 from app.models.base import engine, Base, AsyncSessionLocal
 from app.models.books import Book
 from app.models.users import User
-from app.models.reviews import Review
+from app.models.reviews import Review, ADJUST_BOOK_RATING, book_rating_deltas
+
+# Sample accounts only exist for local testing, so their passwords are hashed
+# at bcrypt's minimum cost instead of settings.BCRYPT_ROUNDS
+SEED_BCRYPT_ROUNDS = 4
+
+
+def seed_password_hash(password: str) -> str:
+    """Cheap bcrypt hash for a sample account (verifies like any other hash)"""
+    salt = bcrypt.gensalt(rounds=SEED_BCRYPT_ROUNDS)
+    return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+
+
+def create_missing_tables(conn) -> List[str]:
+    """
+    Create only the missing tables. One catalog query lists the existing
+    tables, instead of create_all's existence probe per table.
+    """
+    existing = set(inspect(conn).get_table_names())
+    missing = [table for name, table in Base.metadata.tables.items() if name not in existing]
+    if missing:
+        Base.metadata.create_all(conn, tables=missing, checkfirst=False)
+    return [table.name for table in missing]
 
 
 async def init_database():
     """Initialize the database with tables and sample data"""
     print("🚀 Initializing database...")
     
-    # Create all tables
+    # Create the tables that don't exist yet
     async with engine.begin() as conn:
         print("📦 Creating tables...")
-        await conn.run_sync(Base.metadata.create_all)
+        created = await conn.run_sync(create_missing_tables)
     
-    print("✅ Tables created successfully!")
+    if created:
+        print(f"✅ Tables created successfully: {', '.join(created)}")
+    else:
+        print("✅ All tables already exist")
     
     # Add sample data
     async with AsyncSessionLocal() as session:
@@ -46,106 +73,111 @@ async def init_database():
             
             print("📝 Adding sample data...")
             
-            # Create sample user
-            sample_user = User(
-                username="shefaliverma",
-                email="shefali@example.com",
-                full_name="Shefali Verma",
-                bio="Book enthusiast and software developer",
-                preferred_genres="Fiction, Technology, Self-Help",
-                is_active=True,
-                is_admin=True
+            # Rows go in with one multi-row INSERT ... RETURNING per table
+            # instead of tracking each ORM object through the unit of work
+            user_ids = await session.scalars(
+                insert(User).returning(User.id, sort_by_parameter_order=True),
+                [
+                    {
+                        "username": "shefaliverma",
+                        "email": "shefali@example.com",
+                        "hashed_password": seed_password_hash("password123"),
+                        "full_name": "Shefali Verma",
+                        "bio": "Book enthusiast and software developer",
+                        "preferred_genres": "Fiction, Technology, Self-Help",
+                        "is_active": True,
+                        "is_admin": True,
+                    },
+                    # Another sample user for testing
+                    {
+                        "username": "testuser",
+                        "email": "test@example.com",
+                        "hashed_password": seed_password_hash("testpass123"),
+                        "full_name": "Test User",
+                        "is_active": True,
+                        "is_admin": False,
+                    },
+                ]
             )
-            sample_user.set_password("password123")
-            session.add(sample_user)
-            
-            # Create another sample user for testing
-            test_user = User(
-                username="testuser",
-                email="test@example.com",
-                full_name="Test User",
-                is_active=True,
-                is_admin=False
-            )
-            test_user.set_password("testpass123")
-            session.add(test_user)
-            
-            await session.flush()  # Get user IDs
+            sample_user_id, test_user_id = user_ids.all()
             
             # Create sample books
             sample_books = [
-                Book(
-                    title="The Great Gatsby",
-                    author="F. Scott Fitzgerald",
-                    genre="Fiction",
-                    year_published=1925,
-                    summary="A story of wealth, love, and the American Dream in the Jazz Age."
-                ),
-                Book(
-                    title="Clean Code",
-                    author="Robert C. Martin",
-                    genre="Technology",
-                    year_published=2008,
-                    summary="A handbook of agile software craftsmanship with practical advice on writing clean, maintainable code."
-                ),
-                Book(
-                    title="Atomic Habits",
-                    author="James Clear",
-                    genre="Self-Help",
-                    year_published=2018,
-                    summary="An easy and proven way to build good habits and break bad ones."
-                ),
-                Book(
-                    title="To Kill a Mockingbird",
-                    author="Harper Lee",
-                    genre="Fiction",
-                    year_published=1960,
-                    summary="A powerful story of racial injustice and childhood innocence in the American South."
-                ),
-                Book(
-                    title="The Pragmatic Programmer",
-                    author="David Thomas, Andrew Hunt",
-                    genre="Technology",
-                    year_published=1999,
-                    summary="Classic guide covering best practices and practical approaches to software development."
-                ),
+                {
+                    "title": "The Great Gatsby",
+                    "author": "F. Scott Fitzgerald",
+                    "genre": "Fiction",
+                    "year_published": 1925,
+                    "summary": "A story of wealth, love, and the American Dream in the Jazz Age."
+                },
+                {
+                    "title": "Clean Code",
+                    "author": "Robert C. Martin",
+                    "genre": "Technology",
+                    "year_published": 2008,
+                    "summary": "A handbook of agile software craftsmanship with practical advice on writing clean, maintainable code."
+                },
+                {
+                    "title": "Atomic Habits",
+                    "author": "James Clear",
+                    "genre": "Self-Help",
+                    "year_published": 2018,
+                    "summary": "An easy and proven way to build good habits and break bad ones."
+                },
+                {
+                    "title": "To Kill a Mockingbird",
+                    "author": "Harper Lee",
+                    "genre": "Fiction",
+                    "year_published": 1960,
+                    "summary": "A powerful story of racial injustice and childhood innocence in the American South."
+                },
+                {
+                    "title": "The Pragmatic Programmer",
+                    "author": "David Thomas, Andrew Hunt",
+                    "genre": "Technology",
+                    "year_published": 1999,
+                    "summary": "Classic guide covering best practices and practical approaches to software development."
+                },
             ]
             
-            for book in sample_books:
-                session.add(book)
-            
-            await session.flush()  # Get book IDs
+            book_ids = (await session.scalars(
+                insert(Book).returning(Book.id, sort_by_parameter_order=True), sample_books
+            )).all()
             
             # Create sample reviews
             sample_reviews = [
-                Review(
-                    book_id=sample_books[0].id,
-                    user_id=sample_user.id,
-                    review_text="A timeless classic that captures the essence of the American Dream. Beautifully written!",
-                    rating=5.0
-                ),
-                Review(
-                    book_id=sample_books[1].id,
-                    user_id=sample_user.id,
-                    review_text="Essential reading for any developer. Changed how I write code.",
-                    rating=4.5
-                ),
-                Review(
-                    book_id=sample_books[2].id,
-                    user_id=test_user.id,
-                    review_text="Practical and actionable advice. Highly recommended for personal growth.",
-                    rating=5.0
-                ),
-                Review(
-                    book_id=sample_books[0].id,
-                    user_id=test_user.id,
-                    review_text="Great story but a bit slow in places. Still worth reading.",
-                    rating=4.0
-                ),
+                {
+                    "book_id": book_ids[0],
+                    "user_id": sample_user_id,
+                    "review_text": "A timeless classic that captures the essence of the American Dream. Beautifully written!",
+                    "rating": 5.0
+                },
+                {
+                    "book_id": book_ids[1],
+                    "user_id": sample_user_id,
+                    "review_text": "Essential reading for any developer. Changed how I write code.",
+                    "rating": 4.5
+                },
+                {
+                    "book_id": book_ids[2],
+                    "user_id": test_user_id,
+                    "review_text": "Practical and actionable advice. Highly recommended for personal growth.",
+                    "rating": 5.0
+                },
+                {
+                    "book_id": book_ids[0],
+                    "user_id": test_user_id,
+                    "review_text": "Great story but a bit slow in places. Still worth reading.",
+                    "rating": 4.0
+                },
             ]
             
-            for review in sample_reviews:
-                session.add(review)
+            await session.execute(insert(Review), sample_reviews)
+            
+            # Bulk inserts skip the review mapper events, so set the book counters here
+            await session.execute(ADJUST_BOOK_RATING, book_rating_deltas(
+                (review["book_id"], review["rating"]) for review in sample_reviews
+            ))
             
             await session.commit()
             print("✅ Sample data added successfully!")
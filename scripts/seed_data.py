@@ -3,34 +3,41 @@
 Seed script to add dummy data to the database.
 Run: python scripts/seed_data.py
 """
+import csv
+import io
 import sys
 import os
-import re
 
 # Add parent directory to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
 
-# Load environment variables
-load_dotenv()
-
-# Get database URL
-database_url = os.getenv("DATABASE_URL", "postgresql://localhost/book_management")
-
-# Remove channel_binding parameter if present
-if "channel_binding" in database_url:
-    database_url = re.sub(r'[&?]channel_binding=[^&]*', '', database_url)
+from _common import SEED_PASSWORD, get_engine, seed_password_hash
 
 print(f"🔌 Connecting to database...")
 
 # Create engine and session
-engine = create_engine(database_url)
+engine = get_engine()
 Session = sessionmaker(bind=engine)
 session = Session()
 
+
+def copy_rows(table, columns, rows):
+    """
+    Load rows with one COPY ... FROM STDIN instead of an INSERT per row.
+    Omitted columns (created_at / updated_at) take their server defaults.
+    """
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cursor = session.connection().connection.cursor()
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+    )
+
+
 try:
     # Check connection
     session.execute(text("SELECT 1"))
@@ -48,12 +55,16 @@ try:
     
     print("\n📝 Adding dummy data...")
     
+    # Everything below is one transaction of throwaway dev data: don't wait
+    # for the WAL flush at commit (reset when the transaction ends)
+    session.execute(text("SET LOCAL synchronous_commit = OFF"))
+    
     # ========== ADD USERS ==========
     print("\n👤 Adding users...")
     
-    # Hash for password "password123" using bcrypt
-    # In real scenario, use passlib to generate this
-    password_hash = "$2b$12$LQv3c1yqBWVHxkd0LHAkCOYz6TtxMQJqhN8/X4.VTtYQqzQzJzJzK"
+    # One real hash of the seed password, shared by every user, so logins
+    # work without running fix_passwords.py afterwards
+    password_hash = seed_password_hash()
     
     users_data = [
         ("shefaliverma", "shefali@example.com", password_hash, "Shefali Verma", "Book lover and developer", "Fiction, Technology", True, True),
@@ -63,15 +74,10 @@ try:
         ("bookworm123", "bookworm@example.com", password_hash, "Book Worm", "Reading is my passion", "Fantasy, Sci-Fi", True, False),
     ]
     
-    for user in users_data:
-        session.execute(text("""
-            INSERT INTO users (username, email, hashed_password, full_name, bio, preferred_genres, is_active, is_admin, created_at, updated_at)
-            VALUES (:username, :email, :password, :full_name, :bio, :genres, :is_active, :is_admin, NOW(), NOW())
-        """), {
-            "username": user[0], "email": user[1], "password": user[2],
-            "full_name": user[3], "bio": user[4], "genres": user[5],
-            "is_active": user[6], "is_admin": user[7]
-        })
+    copy_rows("users", (
+        "username", "email", "hashed_password", "full_name", "bio",
+        "preferred_genres", "is_active", "is_admin"
+    ), users_data)
     
     print(f"   ✅ Added {len(users_data)} users")
     
@@ -126,14 +132,7 @@ try:
          "Holden Caulfield's journey through New York City after being expelled from prep school."),
     ]
     
-    for book in books_data:
-        session.execute(text("""
-            INSERT INTO books (title, author, genre, year_published, summary, created_at, updated_at)
-            VALUES (:title, :author, :genre, :year, :summary, NOW(), NOW())
-        """), {
-            "title": book[0], "author": book[1], "genre": book[2],
-            "year": book[3], "summary": book[4]
-        })
+    copy_rows("books", ("title", "author", "genre", "year_published", "summary"), books_data)
     
     print(f"   ✅ Added {len(books_data)} books")
     
@@ -191,17 +190,17 @@ try:
         (15, 3, "Raw and honest portrayal of teenage angst.", 4.0),
     ]
     
-    for review in reviews_data:
-        session.execute(text("""
-            INSERT INTO reviews (book_id, user_id, review_text, rating, created_at, updated_at)
-            VALUES (:book_id, :user_id, :review_text, :rating, NOW(), NOW())
-        """), {
-            "book_id": review[0], "user_id": review[1],
-            "review_text": review[2], "rating": review[3]
-        })
+    copy_rows("reviews", ("book_id", "user_id", "review_text", "rating"), reviews_data)
     
     print(f"   ✅ Added {len(reviews_data)} reviews")
     
+    # COPY skips the ORM review events, so refresh the books' review counters
+    session.execute(text("""
+        UPDATE books SET
+            total_reviews = (SELECT COUNT(*) FROM reviews WHERE reviews.book_id = books.id),
+            rating_sum = (SELECT COALESCE(SUM(rating), 0) FROM reviews WHERE reviews.book_id = books.id)
+    """))
+    
     # Commit all changes
     session.commit()
     
@@ -214,7 +213,7 @@ try:
     print(f"   ⭐ Reviews: {len(reviews_data)}")
     print(f"\n🔑 Login credentials:")
     print(f"   Username: shefaliverma")
-    print(f"   Password: password123")
+    print(f"   Password: {SEED_PASSWORD}")
     print(f"\n🚀 Start the server:")
     print(f"   uvicorn app.main:app --reload")
     print(f"\n📖 API Docs: http://localhost:8000/docs")
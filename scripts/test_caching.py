@@ -146,7 +146,7 @@ async def test_caching():
     print("\n🗑️  Step 5: Testing Cache Invalidation...")
     print("-" * 40)
     
-    cleared = await cache_service.invalidate_book_caches(book_id=1)
+    await cache_service.invalidate_book_caches(1)
     print("   Invalidated book caches: ✅")
     
     # Verify cache was cleared
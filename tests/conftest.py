@@ -4,8 +4,9 @@ Test configuration and fixtures
 import pytest
 import pytest_asyncio
 import asyncio
-from typing import AsyncGenerator
+from typing import AsyncGenerator, List
 from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import StaticPool
 
@@ -14,6 +15,9 @@ from app.models.base import Base, get_db
 from app.models.users import User
 from app.models.books import Book
 from app.models.reviews import Review
+from app.services.similarity_index import similarity_index
+from app.services.auth_service import _token_cache
+from app.services.user_service import _password_cache
 
 # Test database URL (SQLite for testing)
 SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
@@ -58,6 +62,10 @@ async def setup_database():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
+    # The TF-IDF index, token and password caches are process-wide; reset them for each fresh database
+    similarity_index.invalidate()
+    _token_cache.clear()
+    _password_cache.clear()
     yield
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
@@ -78,6 +86,19 @@ async def async_client(setup_database) -> AsyncGenerator[AsyncClient, None]:
         yield client
 
 
+@pytest.fixture
+def query_log() -> List[str]:
+    """Record every SQL statement sent to the test database"""
+    statements: List[str] = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
 @pytest_asyncio.fixture
 async def test_user(db_session: AsyncSession) -> User:
     """Create a test user"""
@@ -0,0 +1,55 @@
+"""
+Tests for the async request batcher
+"""
+import asyncio
+import pytest
+
+from app.services.batch_service import AsyncBatcher
+
+
+async def _upper(items):
+    if "slow" in items:
+        await asyncio.sleep(0.5)
+    return [item.upper() for item in items]
+
+
+@pytest.mark.asyncio
+class TestAsyncBatcher:
+    """Test batching, ordering and concurrent dispatch"""
+
+    async def test_results_in_submission_order(self):
+        """Test concurrent submissions are batched and each gets its own result"""
+        calls = []
+        
+        async def handler(items):
+            calls.append(len(items))
+            return await _upper(items)
+        
+        batcher = AsyncBatcher(handler, batch_size=4, max_wait_ms=20)
+        results = await asyncio.gather(*(batcher.submit(item) for item in "abcdef"))
+        await batcher.stop()
+        
+        assert results == list("ABCDEF")
+        assert calls == [4, 2]
+
+    async def test_slow_batch_does_not_block_queue(self):
+        """Test a slow batch doesn't delay the next one when concurrency allows"""
+        batcher = AsyncBatcher(_upper, batch_size=1, max_wait_ms=1, max_concurrency=2)
+        slow = asyncio.create_task(batcher.submit("slow"))
+        await asyncio.sleep(0.01)
+        
+        fast = await asyncio.wait_for(batcher.submit("fast"), timeout=0.2)
+        assert fast == "FAST"
+        assert not slow.done()
+        assert await slow == "SLOW"
+        await batcher.stop()
+
+    async def test_handler_error_fails_batch(self):
+        """Test a failing handler raises in every caller of the batch"""
+        async def handler(items):
+            raise ValueError("boom")
+        
+        batcher = AsyncBatcher(handler, batch_size=2, max_wait_ms=5)
+        with pytest.raises(ValueError):
+            await batcher.submit("a")
+        await batcher.stop()
@@ -71,6 +71,19 @@ class TestBooks:
         book_found = any(book["id"] == test_book.id for book in data)
         assert book_found
 
+    async def test_get_books_include_reviews(self, async_client: AsyncClient, test_book: Book, test_review):
+        """Test embedding reviews in the book list - GET /books?include=reviews"""
+        response = await async_client.get("/api/v1/books/?include=reviews")
+        assert response.status_code == 200
+        
+        data = response.json()
+        book = next(book for book in data if book["id"] == test_book.id)
+        assert [review["id"] for review in book["reviews"]] == [test_review.id]
+        
+        # Reviews are not embedded by default
+        response = await async_client.get("/api/v1/books/")
+        assert all("reviews" not in book for book in response.json())
+
     async def test_get_book_by_id(self, async_client: AsyncClient, test_book: Book):
         """Test getting a specific book by ID - GET /books/<id>"""
         response = await async_client.get(f"/api/v1/books/{test_book.id}")
@@ -83,6 +96,26 @@ class TestBooks:
         assert data["genre"] == test_book.genre
         assert data["year_published"] == test_book.year_published
 
+    async def test_get_book_include_reviews(self, async_client: AsyncClient, test_review):
+        """Test embedding reviews in a single book - GET /books/<id>?include=reviews"""
+        response = await async_client.get(f"/api/v1/books/{test_review.book_id}?include=reviews")
+        assert response.status_code == 200
+        assert [review["id"] for review in response.json()["reviews"]] == [test_review.id]
+        
+        response = await async_client.get(f"/api/v1/books/{test_review.book_id}")
+        assert "reviews" not in response.json()
+
+    async def test_get_book_etag(self, async_client: AsyncClient, test_book: Book):
+        """Test conditional GET with ETag / If-None-Match"""
+        response = await async_client.get(f"/api/v1/books/{test_book.id}")
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+        
+        response = await async_client.get(f"/api/v1/books/{test_book.id}", headers={"If-None-Match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["cache-control"].startswith("public, max-age=")
+
     async def test_get_nonexistent_book(self, async_client: AsyncClient):
         """Test getting a book that doesn't exist"""
         response = await async_client.get("/api/v1/books/99999")
@@ -173,6 +206,24 @@ class TestBooks:
         data = response.json()
         assert len(data) <= 2
 
+    async def test_keyset_pagination(self, async_client: AsyncClient):
+        """Test book pagination with after_id"""
+        for i in range(5):
+            await async_client.post("/api/v1/books/", json={
+                "title": f"Keyset Test Book {i}",
+                "author": f"Author {i}",
+                "genre": "Test"
+            })
+        
+        first_page = (await async_client.get("/api/v1/books/?limit=2")).json()
+        assert len(first_page) == 2
+        
+        response = await async_client.get(f"/api/v1/books/?limit=2&after_id={first_page[-1]['id']}")
+        assert response.status_code == 200
+        second_page = response.json()
+        assert len(second_page) == 2
+        assert second_page[0]["id"] > first_page[-1]["id"]
+
     async def test_generate_book_summary(self, async_client: AsyncClient, test_book: Book):
         """Test generating AI summary for a book - POST /books/<id>/generate-summary"""
         response = await async_client.post(f"/api/v1/books/{test_book.id}/generate-summary")
@@ -183,6 +234,18 @@ class TestBooks:
         assert data["book_id"] == test_book.id
         assert len(data["summary"]) > 0
 
+    async def test_generate_book_summaries(self, async_client: AsyncClient, test_book: Book):
+        """Test bulk summary generation - POST /books/generate-summaries"""
+        response = await async_client.post(
+            "/api/v1/books/generate-summaries", json={"book_ids": [test_book.id, 99999]}
+        )
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert [item["book_id"] for item in data["summaries"]] == [test_book.id]
+        assert len(data["summaries"][0]["summary"]) > 0
+        assert data["missing_book_ids"] == [99999]
+
     async def test_get_book_summary_with_reviews(self, async_client: AsyncClient, test_book: Book):
         """Test getting book summary with aggregated reviews - GET /books/<id>/summary"""
         response = await async_client.get(f"/api/v1/books/{test_book.id}/summary")
@@ -194,6 +257,17 @@ class TestBooks:
         assert data["author"] == test_book.author
         assert "summary" in data
         assert "review_summary" in data
+        assert data["total_reviews"] == 0
+        assert data["average_rating"] is None
+
+    async def test_get_book_summary_rating_stats(self, async_client: AsyncClient, test_review):
+        """Test the aggregated rating in the book summary"""
+        response = await async_client.get(f"/api/v1/books/{test_review.book_id}/summary")
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert data["total_reviews"] == 1
+        assert data["average_rating"] == test_review.rating
 
     async def test_add_review_to_book(self, async_client: AsyncClient, test_book: Book, test_user):
         """Test adding a review for a book - POST /books/<id>/reviews"""
@@ -211,6 +285,14 @@ class TestBooks:
         assert data["rating"] == review_data["rating"]
         assert data["review_text"] == review_data["review_text"]
 
+    async def test_add_review_to_book_invalid_data(self, async_client: AsyncClient, test_book: Book):
+        """Test that review bodies for a book are validated"""
+        response = await async_client.post(f"/api/v1/books/{test_book.id}/reviews", json={"review_text": "No rating"})
+        assert response.status_code == 422
+        
+        response = await async_client.post(f"/api/v1/books/{test_book.id}/reviews", json={"rating": 6.0})
+        assert response.status_code == 422
+
     async def test_get_book_reviews(self, async_client: AsyncClient, test_book: Book, test_review):
         """Test getting all reviews for a book - GET /books/<id>/reviews"""
         response = await async_client.get(f"/api/v1/books/{test_book.id}/reviews")
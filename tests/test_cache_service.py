@@ -0,0 +1,164 @@
+"""
+Tests for the Redis cache service (run against an in-memory fake Redis)
+"""
+import asyncio
+import pytest
+import pytest_asyncio
+from fakeredis import aioredis
+
+from app.services.cache_service import COMPRESS_THRESHOLD, CacheService, _pack, _unpack
+
+
+@pytest_asyncio.fixture
+async def cache():
+    """A connected CacheService backed by fakeredis"""
+    service = CacheService()
+    service._redis = aioredis.FakeRedis(decode_responses=False)
+    service._connected = True
+    yield service
+    await service.disconnect()
+
+
+class TestCodec:
+    """Test the msgpack + zstd value framing"""
+
+    def test_small_value_stored_raw(self):
+        """Test small payloads are framed uncompressed"""
+        data = _pack({"id": 1, "title": "Dune"})
+        assert data[:1] == b"R"
+        assert _unpack(data) == {"id": 1, "title": "Dune"}
+
+    def test_large_value_compressed(self):
+        """Test payloads over the threshold are zstd-compressed and round-trip"""
+        value = [{"id": i, "summary": "A long summary. " * 10} for i in range(20)]
+        data = _pack(value)
+        assert data[:1] == b"Z"
+        assert len(data) < COMPRESS_THRESHOLD * 4
+        assert _unpack(data) == value
+
+
+@pytest.mark.asyncio
+class TestReads:
+    """Test get/mget and the in-process cache"""
+
+    async def test_mget(self, cache: CacheService):
+        """Test mget returns values in key order with None for misses"""
+        await cache.set("rec:1", {"a": 1}, wait=True)
+        await cache.set("rec:3", [1, 2, 3], wait=True)
+        
+        assert await cache.mget(["rec:1", "rec:2", "rec:3"]) == [{"a": 1}, None, [1, 2, 3]]
+        assert await cache.mget([]) == []
+
+    async def test_local_cache_serves_hot_keys(self, cache: CacheService):
+        """Test hot prefixes are served from process memory"""
+        await cache.set_ai_summary("abc", "cached summary")
+        await cache._redis.delete("summary:abc")
+        
+        assert await cache.get_ai_summary("abc") == "cached summary"
+
+    async def test_local_cache_skips_other_prefixes(self, cache: CacheService):
+        """Test only LOCAL_CACHE_PREFIXES are kept in process memory"""
+        await cache.set("rec:1", "x", wait=True)
+        await cache._redis.delete("rec:1")
+        
+        assert await cache.get("rec:1") is None
+
+    async def test_local_cache_expires(self, cache: CacheService, monkeypatch):
+        """Test in-process entries expire after LOCAL_CACHE_TTL"""
+        monkeypatch.setattr(CacheService, "LOCAL_CACHE_TTL", 0)
+        await cache.set_ai_summary("abc", "cached summary")
+        await cache._redis.delete("summary:abc")
+        
+        assert await cache.get_ai_summary("abc") is None
+        assert "summary:abc" not in cache._local
+
+
+@pytest.mark.asyncio
+class TestClearPatterns:
+    """Test SCAN + UNLINK invalidation"""
+
+    async def test_clear_patterns(self, cache: CacheService):
+        """Test matching keys are removed from Redis and process memory"""
+        for key in ("popular:None:10", "popular:Fantasy:5", "similar:1:5", "rec:1"):
+            await cache.set(key, [1], wait=True)
+        
+        deleted = await cache.clear_patterns("popular:*", "similar:1:*")
+        
+        assert deleted == 3
+        assert await cache._redis.exists("rec:1")
+        assert not await cache._redis.exists("popular:None:10", "popular:Fantasy:5", "similar:1:5")
+        assert await cache.get("popular:None:10") is None
+
+    async def test_clear_patterns_no_match(self, cache: CacheService):
+        """Test clearing an unused pattern is a no-op"""
+        assert await cache.clear_patterns("missing:*") == 0
+
+
+@pytest.mark.asyncio
+class TestSingleFlight:
+    """Test the summary lock and stampede protection"""
+
+    async def test_lock_is_exclusive(self, cache: CacheService):
+        """Test a held lock can't be taken until its owner releases it"""
+        token = await cache.acquire_lock("summary:abc")
+        assert token
+        assert await cache.acquire_lock("summary:abc") is None
+        
+        await cache.release_lock("summary:abc", "not-the-owner")
+        assert await cache.acquire_lock("summary:abc") is None
+        
+        await cache.release_lock("summary:abc", token)
+        assert await cache.acquire_lock("summary:abc")
+
+    async def test_wait_for_times_out(self, cache: CacheService):
+        """Test wait_for gives up when nobody publishes the value"""
+        assert await cache.wait_for("summary:missing", timeout=0.2) is None
+
+    async def test_get_or_set_summary_computes_once(self, cache: CacheService):
+        """Test concurrent misses for the same content call the model once"""
+        calls = 0
+        
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.2)
+            return "generated"
+        
+        results = await asyncio.gather(
+            *(cache.get_or_set_summary("abc", compute) for _ in range(5))
+        )
+        
+        assert results == ["generated"] * 5
+        assert calls == 1
+        assert not await cache._redis.exists("summary:abc:lock")
+
+
+@pytest.mark.asyncio
+class TestWriteBehind:
+    """Test queued set() writes"""
+
+    async def test_set_reaches_redis(self, cache: CacheService):
+        """Test a queued write is readable at once and lands in Redis after a flush"""
+        assert await cache.set("rec:1", {"a": 1})
+        assert await cache.get("rec:1") == {"a": 1}
+        
+        await cache.flush_writes()
+        assert await cache._redis.exists("rec:1")
+
+    async def test_set_then_invalidate(self, cache: CacheService):
+        """Test a queued write can't land after an invalidation and resurrect the key"""
+        await cache.set("popular:None:10", [1, 2])
+        await cache.set("similar:1:5", [3])
+        await cache.invalidate_book_caches(1)
+        
+        await asyncio.sleep(0.05)  # past the writer's batching window
+        assert not await cache._redis.exists("popular:None:10", "similar:1:5")
+        assert await cache.get("popular:None:10") is None
+
+    async def test_set_then_delete(self, cache: CacheService):
+        """Test delete() removes a value whose write was still queued"""
+        await cache.set("rec:2", "x")
+        await cache.delete("rec:2")
+        
+        await asyncio.sleep(0.05)
+        assert await cache.get("rec:2") is None
@@ -0,0 +1,54 @@
+"""
+Query-count guards against N+1 regressions on the main read endpoints
+"""
+import pytest
+import pytest_asyncio
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.books import Book
+from app.models.reviews import Review
+from app.models.users import User
+
+
+@pytest_asyncio.fixture
+async def books_with_reviews(db_session: AsyncSession, test_user: User):
+    """Create several books with two reviews each"""
+    books = [Book(title=f"Query Count Book {i}", author=f"Author {i}", genre="Test") for i in range(5)]
+    db_session.add_all(books)
+    await db_session.flush()
+    db_session.add_all([
+        Review(book_id=book.id, user_id=test_user.id, rating=rating, review_text="Fine")
+        for book in books
+        for rating in (3.0, 5.0)
+    ])
+    await db_session.commit()
+    return books
+
+
+@pytest.mark.asyncio
+class TestQueryCounts:
+    """Each endpoint must use a fixed number of queries, however many rows it returns"""
+
+    async def test_list_books(self, async_client: AsyncClient, books_with_reviews, query_log):
+        response = await async_client.get("/api/v1/books/?limit=50")
+        assert response.status_code == 200
+        assert len(response.json()) == len(books_with_reviews)
+        assert len(query_log) <= 1
+
+    async def test_list_books_with_reviews(self, async_client: AsyncClient, books_with_reviews, query_log):
+        response = await async_client.get("/api/v1/books/?limit=50&include=reviews")
+        assert response.status_code == 200
+        assert all(len(book["reviews"]) == 2 for book in response.json())
+        assert len(query_log) <= 2
+
+    async def test_get_book_with_reviews(self, async_client: AsyncClient, books_with_reviews, query_log):
+        response = await async_client.get(f"/api/v1/books/{books_with_reviews[0].id}?include=reviews")
+        assert response.status_code == 200
+        assert len(query_log) <= 2
+
+    async def test_list_reviews(self, async_client: AsyncClient, books_with_reviews, query_log):
+        response = await async_client.get("/api/v1/reviews/?limit=50")
+        assert response.status_code == 200
+        assert len(response.json()) == 2 * len(books_with_reviews)
+        assert len(query_log) <= 1
@@ -1,6 +1,7 @@
 """
 Tests for recommendation and AI summary endpoints
 """
+import asyncio
 import pytest
 from httpx import AsyncClient
 
@@ -38,6 +39,17 @@ class TestRecommendations:
         data = response.json()
         assert isinstance(data, list)
 
+    async def test_get_recommendations_count(
+        self, async_client: AsyncClient, auth_headers: dict, test_book: Book, test_book2: Book, test_review: Review
+    ):
+        """Test personalized recommendations return at most count books, best rated first"""
+        response = await async_client.get("/api/v1/recommendations/?count=1", headers=auth_headers)
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert [book["id"] for book in data["books"]] == [test_book.id]
+        assert data["reasoning"]
+
     async def test_get_similar_books(self, async_client: AsyncClient, test_book: Book, test_book2: Book):
         """Test getting similar books - GET /recommendations/similar/<id>"""
         response = await async_client.get(f"/api/v1/recommendations/similar/{test_book.id}")
@@ -111,6 +123,21 @@ class TestGenerateSummary:
         # Summary should be shorter than original content
         assert len(data["summary"]) < len(long_content)
 
+    async def test_generate_summary_concurrent_requests(self, async_client: AsyncClient):
+        """Test that concurrent summary requests are batched and each gets its own summary"""
+        contents = [f"Book number {i} is about topic {i}. It has a plot. It ends well." for i in range(5)]
+        
+        responses = await asyncio.gather(*(
+            async_client.post("/api/v1/generate-summary", json={"content": content})
+            for content in contents
+        ))
+        
+        for content, response in zip(contents, responses):
+            assert response.status_code == 200
+            data = response.json()
+            assert data["content_length"] == len(content)
+            assert data["summary"].startswith(content.split(".")[0])
+
 
 @pytest.mark.asyncio
 class TestBookSummaryGeneration:
@@ -143,6 +170,11 @@ class TestBookSummaryGeneration:
         assert "summary" in data
         assert "review_summary" in data
 
+    async def test_get_book_summary_nonexistent_book(self, async_client: AsyncClient):
+        """Test getting book summary for nonexistent book"""
+        response = await async_client.get("/api/v1/books/99999/summary")
+        assert response.status_code == 404
+
 
 @pytest.mark.asyncio
 class TestReviewSummary:
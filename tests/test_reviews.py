@@ -32,6 +32,20 @@ class TestReviews:
         assert "id" in data
         assert "created_at" in data
 
+    async def test_bulk_create_reviews(self, async_client: AsyncClient, test_book: Book, test_user: User):
+        """Test creating several reviews at once - POST /reviews/bulk"""
+        reviews_data = [
+            {"book_id": test_book.id, "user_id": test_user.id, "rating": 3.0 + i, "review_text": f"Bulk review {i}"}
+            for i in range(3)
+        ]
+        
+        response = await async_client.post("/api/v1/reviews/bulk", json=reviews_data)
+        assert response.status_code == 200
+        
+        data = response.json()
+        assert [review["rating"] for review in data] == [3.0, 4.0, 5.0]
+        assert all("id" in review and "created_at" in review for review in data)
+
     async def test_create_review_rating_validation(self, async_client: AsyncClient, test_book: Book):
         """Test that rating must be between 1 and 5"""
         # Rating too low
@@ -152,3 +166,27 @@ class TestReviews:
         assert response.status_code == 200
         data = response.json()
         assert len(data) <= 2
+
+    async def test_review_writes_update_book_rating(self, async_client: AsyncClient, test_book: Book, test_user: User):
+        """Test review create/bulk/update/delete keep the book's rating counters in sync"""
+        async def rating_stats():
+            data = (await async_client.get(f"/api/v1/books/{test_book.id}/summary")).json()
+            return data["total_reviews"], data["average_rating"]
+        
+        response = await async_client.post("/api/v1/reviews/", json={
+            "book_id": test_book.id, "user_id": test_user.id, "rating": 2.0
+        })
+        review_id = response.json()["id"]
+        assert await rating_stats() == (1, 2.0)
+        
+        await async_client.post("/api/v1/reviews/bulk", json=[
+            {"book_id": test_book.id, "user_id": test_user.id, "rating": rating}
+            for rating in (4.0, 5.0)
+        ])
+        assert await rating_stats() == (3, 3.67)
+        
+        await async_client.put(f"/api/v1/reviews/{review_id}", json={"rating": 5.0})
+        assert await rating_stats() == (3, 4.67)
+        
+        await async_client.delete(f"/api/v1/reviews/{review_id}")
+        assert await rating_stats() == (2, 4.5)
@@ -0,0 +1,78 @@
+"""
+Tests for the in-memory TF-IDF similarity index
+"""
+from app.services.similarity_index import SimilarityIndex
+
+
+DOCUMENTS = [
+    (1, "space ship alien war"),
+    (2, "alien space travel"),
+    (3, "cooking pasta recipes"),
+    (4, "war history"),
+]
+
+
+class TestSimilarityIndex:
+    """Test building, querying and appending to the index"""
+
+    def test_most_similar(self):
+        """Test the closest book is ranked first and the book itself is excluded"""
+        index = SimilarityIndex()
+        index.build(DOCUMENTS)
+        
+        similar = index.most_similar(1, 2)
+        assert similar[0] == 2
+        assert 1 not in similar
+        assert index.most_similar(99, 2) == []
+
+    def test_build_empty(self):
+        """Test an empty catalogue builds an empty, usable index"""
+        index = SimilarityIndex()
+        index.build([])
+        
+        assert not index.is_stale
+        assert index.matrix is None
+        assert index.most_similar(1, 5) is None
+
+    def test_build_only_stop_words(self):
+        """Test documents with no usable terms leave no vectors"""
+        index = SimilarityIndex()
+        index.build([(1, "the"), (2, "")])
+        
+        assert index.matrix is None
+
+    def test_add(self):
+        """Test a new book is appended without a rebuild"""
+        index = SimilarityIndex()
+        index.build(DOCUMENTS)
+        
+        index.add(5, "italian pasta cooking")
+        assert not index.is_stale
+        assert index.matrix.shape[0] == 5
+        assert index.most_similar(5, 1) == [3]
+        assert index.most_similar(3, 1) == [5]
+
+    def test_add_to_empty_index_invalidates(self):
+        """Test adding to an index without vectors falls back to a rebuild"""
+        index = SimilarityIndex()
+        index.build([])
+        
+        index.add(1, "space ship")
+        assert index.is_stale
+
+    def test_add_existing_book_invalidates(self):
+        """Test re-adding a known book falls back to a rebuild"""
+        index = SimilarityIndex()
+        index.build(DOCUMENTS)
+        
+        index.add(1, "new content")
+        assert index.is_stale
+
+    def test_build_duplicate_documents(self):
+        """Test books sharing a content string each get their own row"""
+        index = SimilarityIndex()
+        index.build(DOCUMENTS + [(5, "cooking pasta recipes")])
+        
+        assert index.matrix.shape[0] == 5
+        assert index.most_similar(5, 1) == [3]
+        assert index.most_similar(3, 1) == [5]
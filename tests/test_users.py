@@ -5,6 +5,7 @@ import pytest
 from httpx import AsyncClient
 
 from app.models.users import User
+from app.models.reviews import Review
 
 
 @pytest.mark.asyncio
@@ -77,6 +78,20 @@ class TestUsers:
         response = await async_client.get(f"/api/v1/users/{test_user.id}")
         assert response.status_code == 404
 
+    async def test_delete_user_updates_book_counters(self, async_client: AsyncClient, test_review: Review):
+        """Test deleting a user takes their reviews off the book's rating counters"""
+        response = await async_client.delete(f"/api/v1/users/{test_review.user_id}")
+        assert response.status_code == 200
+        
+        data = (await async_client.get(f"/api/v1/books/{test_review.book_id}/summary")).json()
+        assert data["total_reviews"] == 0
+        assert data["average_rating"] is None
+
+    async def test_delete_user_not_found(self, async_client: AsyncClient):
+        """Test deleting a nonexistent user"""
+        response = await async_client.delete("/api/v1/users/99999")
+        assert response.status_code == 404
+
     async def test_create_user_duplicate_email(self, async_client: AsyncClient, test_user: User):
         """Test creating user with duplicate email"""
         user_data = {